@@ -0,0 +1,111 @@
+import os
+import hashlib
+import argparse
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import hanmari_p9p8 as app
+
+# ==========================================
+# HanMARI 헤드리스 배치 렌더러
+# ==========================================
+# 아침마다 UI에서 Status/Period 조합을 하나씩 눌러 보던 작업을 한 번에 처리:
+# 모든 조합 x (Global Top 12, Key Indicators, 포트폴리오 슬롯)의 차트 PNG + 트위터 텍스트를 날짜 폴더에 저장
+#   python hanmari_batch.py [--out batch_output] [--workers 4]
+#   python hanmari_batch.py --check-sessions     (마감 기준 검사만, 어긋나면 종료코드 1)
+DEFAULT_OUT_DIR = "batch_output"
+
+# 워커 프로세스별 상태 (init_worker에서 한 번 채움)
+_worker = {}
+
+def quiet_streamlit():
+    # 브라우저 없이 돌 때 나오는 "missing ScriptRunContext" 경고 억제
+    for name in ('streamlit', 'streamlit.runtime.scriptrunner_utils.script_run_context', 'streamlit.runtime.caching.cache_data_api'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+class DataMismatch(Exception):
+    # 워커가 저장소에서 다시 읽은 패널이 앱이 그리고 있는 패널과 다름 (점진 로딩의 stale 패널, 그 사이 보충 등)
+    pass
+
+def init_worker(tickers, name_map, kst_now, universe=None):
+    # 저장소(로컬 Parquet)에서 패널을 읽어 스냅샷 큐브 생성 -> 워커는 네트워크를 쓰지 않음
+    quiet_streamlit()
+    panel = app.load_price_panel(tickers)
+    pidx = app.PriceIndex(panel.close, panel.high, panel.open)
+    if universe is None:
+        universe = tuple(app.TICKERS.items()) + tuple(name_map.items())
+    _worker['snapshot'] = app.MarketSnapshot(pidx, universe, kst_now)
+    _worker['name_map'] = name_map
+    _worker['token'] = app.frame_token(panel.close, panel.high, panel.open)
+
+def render_job(job, status, period):
+    out = app.render_overview_panel(job, status, period, _worker['snapshot'], _worker['name_map'])
+    return job[0], status, period, out
+
+def worker_key(data_token, clock_key, tickers, universe, name_map):
+    # 스냅샷을 결정하는 모든 입력: 데이터 토큰 + 세션 시계 + 유니버스/이름표 해시
+    # (포트폴리오 이름만 바뀌어도 티커 튜플은 같을 수 있으므로 이름표까지 포함)
+    digest = hashlib.md5(repr((tickers, universe, sorted(name_map.items()))).encode('utf-8')).hexdigest()
+    return (data_token, clock_key, digest)
+
+def render_panel_task(state_key, tickers, universe, name_map, kst_now, job, status, period):
+    # Streamlit 앱의 상주 풀에서 호출: worker_key가 바뀐 경우에만 스냅샷 재생성
+    if _worker.get('key') != state_key:
+        init_worker(tickers, name_map, kst_now, universe)
+        _worker['key'] = state_key
+    # 저장소에서 읽은 패널이 앱의 패널과 다르면 그리지 않음 -> 호출 측이 자기 스냅샷으로 처리
+    if _worker['token'] != state_key[0]:
+        raise DataMismatch(f"worker {_worker['token']} != app {state_key[0]}")
+    return render_job(job, status, period)
+
+def main():
+    parser = argparse.ArgumentParser(description="HanMARI Market Overview 전체 조합 일괄 렌더링")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="출력 상위 폴더 (하위에 날짜 폴더 생성)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="렌더링 프로세스 수")
+    parser.add_argument("--check-sessions", action="store_true", help="시장별 마감 기준(Completed/Daily)만 검사하고 종료")
+    args = parser.parse_args()
+    quiet_streamlit()
+
+    if args.check_sessions:
+        bad = app.check_session_cutoffs()
+        for market, at, expected, got in bad:
+            print(f"❌ {market} {at:%Y-%m-%d %H:%M} KST: expected {expected}, got {got}")
+        print("session cutoffs OK" if not bad else f"{len(bad)} session cutoff mismatches")
+        raise SystemExit(1 if bad else 0)
+
+    ports = app.load_portfolios()
+    name_map = app.build_name_map(ports)
+    tickers = app.universe_key(name_map)
+    # 시세 보충은 부모에서 한 번만
+    app.sync_price_store(list(tickers))
+
+    kst_now = app.get_korea_time()
+    out_dir = os.path.join(args.out, kst_now.strftime('%Y-%m-%d'))
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = app.overview_jobs(True, True, ports)
+    tasks = [(job, status, period) for status, period in app.SNAPSHOT_COMBOS for job in jobs]
+    written = 0
+    # spawn: fork된 자식이 부모의 matplotlib/스레드 상태를 물려받지 않도록
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context('spawn'),
+                             initializer=init_worker, initargs=(tickers, name_map, kst_now)) as pool:
+        futures = [pool.submit(render_job, *task) for task in tasks]
+        for fut in as_completed(futures):
+            key, status, period, out = fut.result()
+            if out is None:
+                print(f"⚠️ {status}/{period}/{key}: 데이터 없음")
+                continue
+            png, text = out
+            stem = os.path.join(out_dir, f"{status}_{period}_{key}")
+            with open(stem + ".png", "wb") as f:
+                f.write(png)
+            with open(stem + ".txt", "w", encoding="utf-8") as f:
+                f.write(text)
+            written += 1
+            print(f"✅ {stem}.png")
+
+    print(f"{written}/{len(tasks)} panels -> {out_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -5,16 +5,32 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.ticker as mticker
+from matplotlib.figure import Figure
 import plotly.graph_objects as go
+import streamlit.components.v1 as components
 from plotly.subplots import make_subplots
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr, USPresidentsDay,
+    USMemorialDay, USLaborDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
 import platform
 from datetime import datetime, timedelta
 import pytz
 import json
 import os
-import requests
 import base64
 import io
+import hashlib
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from itertools import islice
+from urllib.parse import quote
+from http_client import HttpClient
+from label_layout import text_width, solve_label_positions
+from index_store import IndexSeries, splice_csv
 
 # ==========================================
 # 0. Font & Global Settings
@@ -146,260 +162,983 @@ def get_dynamic_hashtags(names, default_tags):
 # ==========================================
 # 2. Data Engine & GitHub Fetcher
 # ==========================================
-@st.cache_data(ttl=300) 
-def download_all_data():
-    valid_tickers = [v for v in TICKERS.values() if v != 'REAL_ESTATE']
-    df = yf.download(valid_tickers, period="10y", interval="1d", progress=False)
-    close_df, high_df, open_df = parse_downloaded_data(df)
-    return close_df, high_df, open_df, df
-
-@st.cache_data(ttl=300)
-def download_extra_data(tickers_tuple):
-    clean_tickers = [t for t in tickers_tuple if t != 'REAL_ESTATE']
-    if not clean_tickers: 
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    df = yf.download(clean_tickers, period="10y", interval="1d", progress=False)
-    close_df, high_df, open_df = parse_downloaded_data(df)
-    return close_df, high_df, open_df, df
-
-def parse_downloaded_data(df):
-    if df.empty: 
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        
+# [V9.9] 로컬 가격 저장소: 종목별 Parquet 파일에 일봉을 영구 보관하고, 마지막 저장일 이후만 yf.download로 보충
+STORE_DIR = "price_store"
+STORE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+STORE_YEARS = 10
+STORE_OVERLAP_DAYS = 5   # 마지막 봉(장중 미완성 봉)을 다시 받아 덮어쓰기 위한 겹침 구간
+STORE_SYNC_TTL = 60      # 여러 명이 동시에 Refresh를 눌러도 1분 내 재요청은 생략
+STORE_ADJUST_TOLERANCE = 1e-4   # 겹침 구간 종가 상대 오차 허용치 (넘으면 분할/배당 재조정으로 보고 전체 재수신)
+
+@st.cache_resource
+def get_store_state():
+    # inflight = 지금 받고 있는 종목 (네트워크 동안 락은 놓고, 같은 종목을 요청한 쪽만 완료를 기다림)
+    lock = threading.Lock()
+    return {'lock': lock, 'cond': threading.Condition(lock), 'synced_at': {}, 'inflight': set()}
+
+def store_path(ticker):
+    return os.path.join(STORE_DIR, f"{quote(ticker, safe='')}.parquet")
+
+def read_store(ticker):
+    path = store_path(ticker)
+    if not os.path.exists(path): 
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+def write_store(ticker, df):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = store_path(ticker)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+def split_by_ticker(df, tickers):
+    # yf.download 결과를 {티커: OHLCV DataFrame}으로 분해
+    out = {}
+    if df is None or df.empty: 
+        return out
+    df.index = pd.to_datetime(df.index).tz_localize(None)
+    
     if isinstance(df.columns, pd.MultiIndex):
-        level = 0 if 'Close' in df.columns.get_level_values(0) else 1
-        close_df = df.xs('Close', axis=1, level=level)
-        high_df = df.xs('High', axis=1, level=level)
-        open_df = df.xs('Open', axis=1, level=level)
-    else:
-        close_df = pd.DataFrame(df['Close'])
-        high_df = pd.DataFrame(df['High'])
-        open_df = pd.DataFrame(df['Open'])
+        t_level = 1 if 'Close' in df.columns.get_level_values(0) else 0
+        for t in df.columns.get_level_values(t_level).unique():
+            out[t] = df.xs(t, axis=1, level=t_level)
+    elif len(tickers) == 1:
+        out[tickers[0]] = df
         
-    close_df.index = pd.to_datetime(close_df.index).tz_localize(None)
-    high_df.index = pd.to_datetime(high_df.index).tz_localize(None)
-    open_df.index = pd.to_datetime(open_df.index).tz_localize(None)
-    return close_df, high_df, open_df
+    for t in list(out.keys()):
+        sub = out[t].reindex(columns=STORE_FIELDS).dropna(subset=['Close'])
+        if sub.empty:
+            del out[t]
+        else:
+            out[t] = sub.astype('float64')
+    return out
+
+# [V9.9] 샤드 병렬 수집기: 종목 묶음을 제한된 스레드풀로 받고, 실패 종목만 개별 재시도(지수 백오프)
+# 소요 시간은 실제 호출 단위로 기록 (묶음 호출 = shard, 단일 종목 호출 = symbol)
+# 느린 묶음의 종목은 다음 수집 때 하나씩 받아 종목별 시간을 실측 -> 빠르면 다시 묶음으로 복귀
+FETCH_SHARD_SIZE = 4
+FETCH_MAX_WORKERS = 4
+FETCH_RETRIES = 2
+FETCH_BACKOFF = 1.0
+FETCH_TIMEOUT = 10
+FETCH_SLOW_SECONDS = 5.0
 
-# [V9.8 수술] 에러 알림 + 불순물(콤마, 제목행 파괴) 자동 정제 "방탄 파서"
-@st.cache_data(ttl=600)
-def fetch_github_real_estate(token):
-    url = "https://api.github.com/repos/4onlyone/HanmariApp/contents/gangnam11_apt.csv"
-    headers = {"Authorization": f"token {token}"} if token else {}
+@st.cache_resource
+def get_fetch_stats():
+    return {'lock': threading.Lock(), 'calls': {}, 'isolated': set()}
+
+def record_fetch(symbols, elapsed, ok):
+    # 호출 1회 = 기록 1회 (묶음 시간을 종목마다 나눠 적지 않음)
+    stats = get_fetch_stats()
+    with stats['lock']:
+        key = ','.join(symbols)
+        s = stats['calls'].setdefault(key, {'scope': 'symbol' if len(symbols) == 1 else 'shard',
+                                            'calls': 0, 'failures': 0, 'last_sec': 0.0, 'total_sec': 0.0})
+        s['calls'] += 1
+        s['failures'] += 0 if ok else 1
+        s['last_sec'] = elapsed
+        s['total_sec'] += elapsed
+        if elapsed > FETCH_SLOW_SECONDS and len(symbols) > 1:
+            stats['isolated'].update(symbols)
+        elif ok and elapsed <= FETCH_SLOW_SECONDS and len(symbols) == 1:
+            stats['isolated'].discard(symbols[0])
+
+def fetch_stats_df():
+    stats = get_fetch_stats()
+    with stats['lock']:
+        rows = [{'symbols': k, **v} for k, v in stats['calls'].items()]
+    if not rows: 
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df['avg_sec'] = df['total_sec'] / df['calls']
+    return df.drop(columns='total_sec').sort_values('last_sec', ascending=False).reset_index(drop=True)
+
+def timed_download(tickers, **kwargs):
+    t0 = time.time()
     try:
-        res = requests.get(url, headers=headers)
-        if res.status_code == 200:
-            data = res.json()
-            content = base64.b64decode(data['content']).decode('utf-8')
-            # 양식 파괴: 무조건 첫번째 열 날짜, 두번째 열 값으로 강제 덮어쓰기
-            df = pd.read_csv(io.StringIO(content), header=0)
-            if len(df.columns) >= 2:
-                df = df.iloc[:, [0, 1]] 
-                df.columns = ['Date', 'Value'] 
-                df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-                
-                # 콤마 자동 치유: 문자로 인식된 경우 콤마 삭제 후 실수(float) 변환
-                if df['Value'].dtype == object:
-                    df['Value'] = df['Value'].astype(str).str.replace(',', '', regex=False)
-                df['Value'] = pd.to_numeric(df['Value'], errors='coerce')
-                
-                df = df.dropna(subset=['Date', 'Value'])
-                if not df.empty:
-                    return df.set_index('Date')
+        df = yf.download(tickers, interval="1d", progress=False, threads=False, timeout=FETCH_TIMEOUT, **kwargs)
+    except Exception:
+        df = None
+    return split_by_ticker(df, tickers), time.time() - t0
+
+def fetch_shard(shard, **kwargs):
+    got, elapsed = timed_download(shard, **kwargs)
+    record_fetch(shard, elapsed, all(t in got for t in shard))
+        
+    for t in [t for t in shard if t not in got]:
+        for attempt in range(FETCH_RETRIES):
+            time.sleep(FETCH_BACKOFF * (2 ** attempt))
+            single, elapsed = timed_download([t], **kwargs)
+            record_fetch([t], elapsed, t in single)
+            if t in single:
+                got[t] = single[t]
+                break
+    return got
+
+def fetch_ohlcv_sharded(tickers, **kwargs):
+    tickers = list(tickers)
+    if not tickers: 
+        return {}
+    stats = get_fetch_stats()
+    with stats['lock']:
+        isolated = [t for t in tickers if t in stats['isolated']]
+    rest = [t for t in tickers if t not in isolated]
+    shards = [[t] for t in isolated] + [rest[i:i + FETCH_SHARD_SIZE] for i in range(0, len(rest), FETCH_SHARD_SIZE)]
+    merged = {}
+    with ThreadPoolExecutor(max_workers=min(FETCH_MAX_WORKERS, len(shards))) as pool:
+        for got in pool.map(lambda shard: fetch_shard(shard, **kwargs), shards):
+            merged.update(got)
+    return merged
+
+# [V9.9] float32 가격 패널: (필드, 날짜, 티커) 연속 배열 하나 + 티커 사전 + 공용 날짜 인덱스
+# Close/High/Open/Volume 프레임은 복사 없는 view로 제공
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PANEL_FIELD_IX = {f: i for i, f in enumerate(PANEL_FIELDS)}
+
+class PricePanel:
+    def __init__(self, values, dates, tickers):
+        # 패널은 세션 간 공유(cache_resource) + frame()은 복사 없는 뷰 -> 배열을 읽기 전용으로 잠가 한 세션의 수정이 모두에게 번지지 않게 함
+        values.setflags(write=False)
+        self.values = values
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.ticker_ix = {t: j for j, t in enumerate(self.tickers)}
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((len(PANEL_FIELDS), 0, 0), dtype=np.float32), pd.DatetimeIndex([]), [])
+
+    @classmethod
+    def from_frames(cls, frames):
+        # {티커: OHLCV DataFrame} -> 패널
+        frames = {t: f for t, f in frames.items() if f is not None and not f.empty}
+        if not frames: 
+            return cls.empty()
+        dates = None
+        for f in frames.values():
+            dates = f.index if dates is None else dates.union(f.index)
+        dates = pd.DatetimeIndex(dates).sort_values()
+        
+        tickers = sorted(frames.keys())
+        values = np.full((len(PANEL_FIELDS), len(dates), len(tickers)), np.nan, dtype=np.float32)
+        for j, t in enumerate(tickers):
+            f = frames[t]
+            values[:, dates.get_indexer(f.index), j] = f.reindex(columns=PANEL_FIELDS).to_numpy(dtype=np.float32).T
+        return cls(values, dates, tickers)
+
+    def is_empty(self):
+        return len(self.tickers) == 0 or len(self.dates) == 0
+
+    def frame(self, field):
+        return pd.DataFrame(self.values[PANEL_FIELD_IX[field]], index=self.dates, columns=self.tickers, copy=False)
+
+    @property
+    def close(self):
+        return self.frame('Close')
+
+    @property
+    def high(self):
+        return self.frame('High')
+
+    @property
+    def open(self):
+        return self.frame('Open')
+
+def overlap_mismatch(old, new):
+    # yf.download(auto_adjust)는 분할·배당 때 과거 전체를 다시 조정 -> 겹치는 확정 봉 종가가 저장값과 다르면 재조정된 것
+    # (마지막 저장 봉은 장중 미완성일 수 있어 비교에서 제외)
+    common = old.index[:-1].intersection(new.index)
+    if common.empty:
+        return False
+    a = old.loc[common, 'Close'].to_numpy(dtype=np.float64)
+    b = new.loc[common, 'Close'].to_numpy(dtype=np.float64)
+    return bool((np.abs(b - a) > STORE_ADJUST_TOLERANCE * np.abs(a)).any())
+
+def save_prices(ticker, df):
+    write_store(ticker, df)
+    try:
+        update_indicator_store(ticker, df)
+    except Exception:
+        pass   # 지표는 다음 보충 때 다시 계산 (가격 저장은 유지)
+
+def refresh_store(tickers):
+    # -> 실제로 받아 저장한 종목 (실패 종목은 빠짐)
+    stored = {t: read_store(t) for t in tickers}
+    
+    # 신규 종목은 10년치 일괄, 기존 종목은 마지막 저장일(-겹침) 기준으로 묶어서 보충
+    requests_by_start = {}
+    for t, old in stored.items():
+        if old is None or old.empty:
+            requests_by_start.setdefault(None, []).append(t)
         else:
-            st.error(f"🚨 [GitHub 통신 에러] 토큰이 만료되었거나 접근 권한이 없습니다. (Status: {res.status_code})")
+            start = (old.index.max() - timedelta(days=STORE_OVERLAP_DAYS)).strftime('%Y-%m-%d')
+            requests_by_start.setdefault(start, []).append(t)
+            
+    done, readjusted = [], []
+    for start, group in requests_by_start.items():
+        if start is None:
+            fetched = fetch_ohlcv_sharded(group, period=f"{STORE_YEARS}y")
+        else:
+            fetched = fetch_ohlcv_sharded(group, start=start)
+            
+        for t, new in fetched.items():
+            old = stored.get(t)
+            if old is not None and not old.empty:
+                if overlap_mismatch(old, new):
+                    readjusted.append(t)
+                    continue
+                new = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+            save_prices(t, new)
+            done.append(t)
+            
+    # 재조정된 종목은 이어 붙이면 접합부에 가짜 급등락이 생기므로 전체를 다시 받아 통째로 교체
+    if readjusted:
+        for t, new in fetch_ohlcv_sharded(readjusted, period=f"{STORE_YEARS}y").items():
+            save_prices(t, new)
+            done.append(t)
+    return done
+
+def sync_price_store(tickers):
+    state = get_store_state()
+    with state['cond']:
+        # 다른 요청이 받고 있는 종목이 있으면 끝날 때까지 대기 후 TTL 판단
+        state['cond'].wait_for(lambda: not (set(tickers) & state['inflight']))
+        now = time.time()
+        stale = [t for t in tickers if now - state['synced_at'].get(t, 0) > STORE_SYNC_TTL]
+        if not stale: 
+            return
+        state['inflight'].update(stale)
+        
+    done = []
+    try:
+        done = refresh_store(stale)
+    finally:
+        with state['cond']:
+            # 받기에 실패한 종목은 표시하지 않음 -> 다음 호출에서 다시 시도
+            for t in done:
+                state['synced_at'][t] = now
+            state['inflight'].difference_update(stale)
+            state['cond'].notify_all()
+
+def load_price_panel(tickers):
+    # 저장소 -> float32 패널, 최근 10년으로 절단
+    cutoff = pd.Timestamp.today().normalize() - pd.DateOffset(years=STORE_YEARS)
+    frames = {}
+    for t in tickers:
+        df = read_store(t)
+        if df is not None and not df.empty:
+            frames[t] = df[df.index >= cutoff]
+    return PricePanel.from_frames(frames)
+
+# [V9.9] 통합 유니버스 로더: TICKERS + 포트폴리오 티커 합집합을 한 번에 정렬된 패널로 생성
+# 키 = 합집합 티커 튜플 -> 정렬 비용은 클릭/사용자마다가 아니라 갱신마다 1회
+def universe_key(name_map=None):
+    tickers = set(TICKERS.values()) | set((name_map or {}).values())
+    return tuple(sorted(tickers - {'REAL_ESTATE'}))
+
+# 패널은 세션 간 공유(cache_resource) -> 사용자마다 10년치 사본을 만들지 않음
+@st.cache_resource(ttl=300, max_entries=4)
+def load_universe_panel(tickers):
+    sync_price_store(list(tickers))
+    return load_price_panel(tickers)
+
+# [V9.9] 점진 로딩: 저장소에 남아 있는 마지막 패널로 먼저 그리고(stale), 최신 시세는 백그라운드 스레드에서 받아 둠
+PROGRESSIVE_FRESH_TTL = 300
+PROGRESSIVE_POLL_SECONDS = 2
+
+@st.cache_resource
+def get_refresh_state():
+    # fresh[티커튜플] = (패널 또는 실패 시 None, 완료 시각, 세대 번호)
+    # running[티커튜플] = 진행 중인 백그라운드 작업의 세대 번호 (작업을 띄울 때 발급, 단조 증가)
+    return {'lock': threading.Lock(), 'running': {}, 'fresh': {}, 'generation': 0}
+
+def next_refresh_generation(state):
+    # state['lock'] 안에서 호출
+    state['generation'] += 1
+    return state['generation']
+
+def refresh_universe_panel(tickers, generation):
+    state = get_refresh_state()
+    panel = None
+    try:
+        panel = load_universe_panel(tickers)
+    finally:
+        with state['lock']:
+            state['fresh'][tickers] = (panel, time.time(), generation)
+            state['running'].pop(tickers, None)
+
+def progressive_panel(tickers):
+    # -> (패널, stale 여부, 기다릴 세대 번호 또는 None = 진행 중인 갱신 없음)
+    state = get_refresh_state()
+    with state['lock']:
+        entry = state['fresh'].get(tickers)
+        recent = entry is not None and time.time() - entry[1] < PROGRESSIVE_FRESH_TTL
+        if recent and entry[0] is not None:
+            return entry[0], False, None
+        if not recent and tickers not in state['running']:
+            generation = next_refresh_generation(state)
+            state['running'][tickers] = generation
+            threading.Thread(target=refresh_universe_panel, args=(tickers, generation), daemon=True).start()
+        pending = state['running'].get(tickers)
+    return load_price_panel(tickers), True, pending
+
+# [V9.9] GitHub 호출 공용 세션 (keep-alive 풀 + 타임아웃 + 재시도 + 지연 통계)
+@st.cache_resource
+def get_http_client():
+    return HttpClient()
+
+# [V9.9] 부동산 시계열 로컬 미러: blob SHA 기준으로 보관, ETag 조건부 요청(304)으로 바뀐 경우에만 재다운로드
+# 입력값은 로컬에 스테이징했다가 한 번의 커밋(PUT)으로 일괄 반영
+# 로컬 미러는 정제가 끝난 열 배열(IndexSeries: int32 날짜 + 값)로 보관 -> CSV 정제는 받을 때 한 번만
+# 원문 CSV도 함께 보관 -> 푸시는 원문에 수정 행만 끼워 넣음 (정제 과정에서 버린 행·원래 표기 보존)
+RE_CONTENTS_URL = "https://api.github.com/repos/4onlyone/HanmariApp/contents/gangnam11_apt.csv"
+RE_MIRROR_DIR = os.path.join(STORE_DIR, "real_estate")
+RE_MIRROR_DATA = os.path.join(RE_MIRROR_DIR, "gangnam11_apt.npz")
+RE_MIRROR_META = os.path.join(RE_MIRROR_DIR, "meta.json")
+RE_MIRROR_CSV = os.path.join(RE_MIRROR_DIR, "gangnam11_apt.csv")   # 원문 CSV (V9.8 미러와 같은 파일)
+RE_SYNC_TTL = 600
+
+def re_token_key(token):
+    # 토큰 원문 대신 해시로 구분 (검증 기록, 스테이징 소유자)
+    return hashlib.sha256(token.encode('utf-8')).hexdigest() if token else ''
+
+@st.cache_resource
+def get_re_mirror():
+    # pending = {토큰 해시: {'YYYY-MM-DD': 값}} -> 스테이징은 토큰별, 푸시도 자기 값만
+    state = {'lock': threading.Lock(), 'series': None, 'content': None, 'sha': None, 'etag': None,
+             'pending': {}, 'checked_at': 0.0, 'verified': set(), 'df': None}
+    # 메타(sha/etag/스테이징)와 시계열 파일은 따로 읽음 -> 시계열이 없어도 스테이징 값은 유지
+    try:
+        with open(RE_MIRROR_META, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        state['sha'], state['etag'] = meta.get('sha'), meta.get('etag')
+        # 소유자 구분이 없던 예전 형식(날짜: 값)은 누구의 값인지 알 수 없으므로 버림
+        state['pending'] = {k: v for k, v in meta.get('pending', {}).items() if isinstance(v, dict)}
+    except Exception:
+        pass
+    try:
+        # newline='' -> 원문 줄바꿈 유지
+        with open(RE_MIRROR_CSV, "r", encoding="utf-8", newline="") as f:
+            state['content'] = f.read()
+    except Exception:
+        pass
+    try:
+        state['series'] = IndexSeries.load(RE_MIRROR_DATA)
+    except Exception:
+        # V9.8 미러(원문 CSV)만 있으면 한 번 변환해 저장
+        try:
+            state['series'] = IndexSeries.from_csv(state['content'])
+            state['series'].save(RE_MIRROR_DATA)
+        except Exception:
+            state['series'] = None
+    return state
+
+def save_re_mirror(state):
+    os.makedirs(RE_MIRROR_DIR, exist_ok=True)
+    if state['content'] is not None:
+        with open(RE_MIRROR_CSV + ".tmp", "w", encoding="utf-8", newline="") as f:
+            f.write(state['content'])
+        os.replace(RE_MIRROR_CSV + ".tmp", RE_MIRROR_CSV)
+    if state['series'] is not None:
+        state['series'].save(RE_MIRROR_DATA)
+    meta = {'sha': state['sha'], 'etag': state['etag'], 'pending': state['pending']}
+    with open(RE_MIRROR_META + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+    os.replace(RE_MIRROR_META + ".tmp", RE_MIRROR_META)
+
+def apply_real_estate_edits(series, edits):
+    # edits = {'YYYY-MM-DD': 값} -> 같은 날짜는 덮어쓰고 새 날짜는 정렬 위치에 추가 (원본은 그대로)
+    out = series.copy()
+    for new_date_str, new_index in sorted(edits.items()):
+        out.upsert(new_date_str, new_index)
+    return out
+
+def sync_real_estate_mirror(token, force=False):
+    # 반환: HTTP 상태코드 (0 = TTL 안이라 원격 확인 생략)
+    # 통신(재시도·백오프 포함)은 잠금 밖에서 -> 조회·스테이징 중인 다른 세션을 막지 않음 (시세 저장소와 같은 방식)
+    state = get_re_mirror()
+    token_key = re_token_key(token)
+    with state['lock']:
+        fresh = time.time() - state['checked_at'] < RE_SYNC_TTL
+        if not force and fresh and state['series'] is not None and token_key in state['verified']:
+            return 0
+        complete = state['series'] is not None and state['content'] is not None
+        seen_sha = state['sha']
+        etag = state['etag'] if complete else None
+        
+    headers = {"Authorization": f"token {token}"} if token else {}
+    if etag:
+        headers["If-None-Match"] = etag
+    res = get_http_client().get(RE_CONTENTS_URL, headers=headers)
+    fetched = None
+    if res.status_code == 200:
+        data = res.json()
+        if data['sha'] != seen_sha or not complete:
+            # [V9.8 방탄 파서] 콤마·공백·제목행 파괴 정제 -> 유효 행이 없으면 ValueError (기존 미러 유지)
+            # 원문은 BOM까지 그대로 보관 ('utf-8'; 제목행은 정제에서 쓰지 않음)
+            content = base64.b64decode(data['content']).decode('utf-8')
+            fetched = (IndexSeries.from_csv(content), content, data['sha'])
+            
+    with state['lock']:
+        if res.status_code in (401, 403):
+            # 만료·권한 회수된 토큰은 검증 기록에서 제거 -> 통신 실패 시 로컬 미러 대체도 불가
+            state['verified'].discard(token_key)
+            return res.status_code
+        # 받는 사이 다른 세션(푸시 등)이 미러를 바꿨으면 이번 응답은 반영하지 않음 (더 새 것일 수 있음)
+        if res.status_code == 200 and state['sha'] == seen_sha:
+            if fetched is not None:
+                state['series'], state['content'], state['sha'] = fetched
+                state['df'] = None
+            state['etag'] = res.headers.get('ETag')
+            save_re_mirror(state)
+        if res.status_code in (200, 304):
+            state['checked_at'] = time.time()
+            state['verified'].add(token_key)
+        return res.status_code
+
+def real_estate_view(state):
+    # 게시된(깃허브에 반영된) 시계열만 표시 -> 스테이징 값은 사이드바에 "미게시"로 따로 표시
+    with state['lock']:
+        if state['df'] is None and state['series'] is not None:
+            state['df'] = state['series'].to_frame()
+        return state['df']
+
+def fetch_github_real_estate(token):
+    state = get_re_mirror()
+    token_key = re_token_key(token)
+    try:
+        status = sync_real_estate_mirror(token)
+    except Exception as e:
+        # 통신 실패: 이미 확인된 토큰이면 로컬 미러로 계속 진행
+        if state['series'] is None or token_key not in state['verified']:
+            st.error(f"🚨 [데이터 파싱 에러] 파일을 읽어오는 중 문제가 발생했습니다: {e}")
             return None
+        st.warning(f"⚠️ 깃허브 확인 실패, 로컬 미러를 사용합니다: {e}")
+        status = 0
+    if status not in (0, 200, 304):
+        st.error(f"🚨 [GitHub 통신 에러] 토큰이 만료되었거나 접근 권한이 없습니다. (Status: {status})")
+        return None
+    try:
+        return real_estate_view(state)
     except Exception as e:
         st.error(f"🚨 [데이터 파싱 에러] 파일을 읽어오는 중 문제가 발생했습니다: {e}")
         return None
-    return None
 
-def update_github_real_estate(token, new_date, new_index):
-    url = "https://api.github.com/repos/4onlyone/HanmariApp/contents/gangnam11_apt.csv"
+def stage_real_estate_update(token, new_date, new_index):
+    # 스테이징 전에 검증 (빈 시리즈에 한 번 넣어 보기) -> 잘못된 값은 ValueError
+    IndexSeries().upsert(new_date, new_index)
+    state = get_re_mirror()
+    with state['lock']:
+        own = state['pending'].setdefault(re_token_key(token), {})
+        own[pd.to_datetime(new_date).strftime('%Y-%m-%d')] = float(new_index)
+        save_re_mirror(state)
+
+def pending_real_estate_updates(token):
+    state = get_re_mirror()
+    with state['lock']:
+        return dict(state['pending'].get(re_token_key(token), {}))
+
+def push_real_estate_updates(token):
+    state = get_re_mirror()
+    token_key = re_token_key(token)
     headers = {"Authorization": f"token {token}"} if token else {}
     try:
-        res = requests.get(url, headers=headers)
-        if res.status_code == 200:
-            data = res.json()
-            sha = data['sha']
-            content = base64.b64decode(data['content']).decode('utf-8')
-            df = pd.read_csv(io.StringIO(content), header=0)
-            
-            new_date_str = pd.to_datetime(new_date).strftime('%Y-%m-%d')
-            
-            if len(df.columns) >= 2:
-                df = df.iloc[:, [0, 1]]
-                df.columns = ['Date', 'Value']
-            
-            if new_date_str in df['Date'].astype(str).values:
-                df.loc[df['Date'].astype(str) == new_date_str, 'Value'] = new_index
-            else:
-                new_row = pd.DataFrame({'Date': [new_date_str], 'Value': [new_index]})
-                df = pd.concat([df, new_row], ignore_index=True)
-            
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-            df = df.dropna(subset=['Date'])
-            df = df.sort_values('Date')
-            df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-            
-            new_csv = df.to_csv(index=False)
-            new_content = base64.b64encode(new_csv.encode('utf-8')).decode('utf-8')
+        # SHA 충돌(409/422)이면 최신본을 다시 받아 한 번 더 시도
+        for _ in range(2):
+            status = sync_real_estate_mirror(token, force=True)
+            if status not in (200, 304):
+                st.error(f"🚨 [GitHub 통신 에러] 토큰이 만료되었거나 접근 권한이 없습니다. (Status: {status})")
+                return False
+            with state['lock']:
+                pending = dict(state['pending'].get(token_key, {}))
+                if not pending:
+                    return True
+                new_series = apply_real_estate_edits(state['series'], pending)
+                new_csv = splice_csv(state['content'], pending)
+                sha = state['sha']
             
+            dates = sorted(pending)
+            label = dates[0] if len(dates) == 1 else f"{dates[0]} ~ {dates[-1]} ({len(dates)})"
             put_data = {
-                "message": f"Update Real Estate Data: {new_date_str}",
-                "content": new_content,
+                "message": f"Update Real Estate Data: {label}",
+                "content": base64.b64encode(new_csv.encode('utf-8')).decode('utf-8'),
                 "sha": sha
             }
-            put_res = requests.put(url, headers=headers, json=put_data)
-            return put_res.status_code in [200, 201]
+            put_res = get_http_client().put(RE_CONTENTS_URL, headers=headers, json=put_data)
+            if put_res.status_code in (200, 201):
+                with state['lock']:
+                    state['series'] = new_series
+                    state['content'] = new_csv
+                    state['sha'] = put_res.json()['content']['sha']
+                    state['etag'] = None
+                    # 푸시 도중 새로 스테이징된 값은 남겨 둠
+                    own = state['pending'].get(token_key, {})
+                    for d, v in pending.items():
+                        if own.get(d) == v:
+                            del own[d]
+                    if not own:
+                        state['pending'].pop(token_key, None)
+                    state['df'] = None
+                    save_re_mirror(state)
+                return True
+            if put_res.status_code in (401, 403):
+                with state['lock']:
+                    state['verified'].discard(token_key)
+            if put_res.status_code not in (409, 422):
+                return False
     except Exception as e:
         st.error(f"🚨 [업데이트 에러] 깃허브 기록 중 문제 발생: {e}")
     return False
 
-def process_data(target_names, period, status_mode, close_df, high_df, open_df, custom_mapping=None):
-    if custom_mapping is None: 
-        custom_mapping = {}
-    res = []
-    kst_now = get_korea_time()
-    today_kst = kst_now.date()
-    
-    if 'KRW=X' in close_df.columns and not close_df['KRW=X'].dropna().empty:
-        usd_krw = float(close_df['KRW=X'].dropna().iloc[-1])
-    else:
-        usd_krw = 1350.0
+# [V9.9] 거래소 세션 달력: 10년치 거래일·마감시각(UTC)을 미리 만들어 두고 "마지막 마감 세션"을 이진 탐색으로 조회
+# (시장: 시간대, 현지 마감시각(분), 실제 거래일 확인용 기준 지수)
+MARKET_SESSIONS = {
+    'krx': ('Asia/Seoul', 15 * 60 + 30, '^KS11'),
+    'nyse': ('America/New_York', 16 * 60, '^GSPC'),
+    'comex': ('America/New_York', 17 * 60, 'GC=F'),
+    'fx': ('UTC', 21 * 60, None),       # 환율·달러지수: 평일 21:00 UTC(= 다음날 06:00 KST) 고정 마감 (V9.8 기준 그대로)
+    'crypto': ('UTC', 24 * 60, None),   # UTC 일봉 = 다음날 00:00 UTC(09:00 KST) 마감
+}
+FX_SESSION_MARKS = ('=X', 'DX-Y')   # Macro 중 24시간 외환 시장 종목 (선물·원자재 ETF는 COMEX 마감)
+KRX_FIXED_HOLIDAYS = [(1, 1), (3, 1), (5, 1), (5, 5), (6, 6), (8, 15), (10, 3), (10, 9), (12, 25), (12, 31)]
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('IndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay, USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
 
-    for name in target_names:
-        ticker = TICKERS.get(name) or custom_mapping.get(name)
-        if not ticker or ticker not in close_df.columns: 
-            continue
-            
-        series = close_df[ticker].dropna()
-        if series.empty: 
-            continue
-        
-        if name in ['Samsung', 'SK Hynix', 'KOSPI', 'TIGER 200', 'HLB', 'HL만도'] or '.KS' in ticker or '.KQ' in ticker or '^KS' in ticker: 
-            cat = 'K-Market'
-        elif name in ['BTC', 'ETH'] or '-USD' in ticker: 
-            cat = 'Crypto'
-        elif name in ['Gold', 'Silver', 'Copper', 'Dollar Index', 'USD/KRW', 'USO', 'BNO'] or '=F' in ticker: 
-            cat = 'Macro'
-        elif name in ['TSMC', '비츠로테크']: 
-            cat = 'Others'
-        elif name in ['NASDAQ', 'S&P 500', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'AMZN', 'GOOG', 'AVGO', 'TSLA', 'META', 'PLTR', 'SpaceX', 'LLY', 'BRK-B'] or '^GSPC' in ticker or '^IXIC' in ticker or (ticker.isalpha() and ticker.isupper()): 
-            cat = 'US Tech'
-        else: 
-            cat = 'Others'
+class COMEXHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        GoodFriday,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
 
-        if status_mode == 'ATH':
-            curr, ath = float(series.iloc[-1]), float(high_df[ticker].dropna().max())
-            change = ((curr - ath) / ath) * 100 if ath > 0 else 0
-            curr_date, base_date = series.index[-1].date(), series.index[-1].date()
+def market_holidays(market, start, end):
+    if market == 'nyse':
+        return NYSEHolidayCalendar().holidays(start, end)
+    if market == 'comex':
+        return COMEXHolidayCalendar().holidays(start, end)
+    if market == 'krx':
+        # 설·추석 등 음력 휴장은 규칙으로 만들지 않고 기준 지수의 실제 거래 기록으로 반영
+        days = [pd.Timestamp(y, m, d) for y in range(start.year, end.year + 1) for m, d in KRX_FIXED_HOLIDAYS]
+        return pd.DatetimeIndex([d for d in days if start <= d <= end])
+    return pd.DatetimeIndex([])
+
+class SessionCalendar:
+    def __init__(self, market, observed_days=None):
+        tz, close_minutes, _ = MARKET_SESSIONS[market]
+        today = pd.Timestamp.now(tz='UTC').tz_localize(None).normalize()
+        start = today - pd.DateOffset(years=STORE_YEARS, days=30)
+        end = today + pd.Timedelta(days=14)
+        
+        days = pd.date_range(start, end, freq='D' if market == 'crypto' else 'B')
+        holidays = market_holidays(market, start, end)
+        if len(holidays): 
+            days = days[~days.isin(holidays)]
+        if observed_days is not None and len(observed_days):
+            # 실제 거래 기록이 있는 구간은 기록이 곧 달력, 그 이후만 규칙 사용
+            last_obs = observed_days.max()
+            days = observed_days[observed_days >= start].union(days[days > last_obs])
             
-        elif status_mode == 'Completed' and period == 'Daily':
-            if cat == 'Crypto':
-                offset = 2 if kst_now.hour < 9 else 1
-                t_date = today_kst - timedelta(days=offset)
-                
-                curr_s = series[series.index.date <= t_date]
-                if ticker in open_df.columns:
-                    o_series = open_df[ticker].dropna()
-                    next_day = t_date + timedelta(days=1)
-                    if (curr_s.empty or curr_s.index[-1].date() < t_date) and (not o_series[o_series.index.date == next_day].empty):
-                        curr = float(o_series[o_series.index.date == next_day].iloc[-1])
-                        curr_date = t_date
-                    else:
-                        if curr_s.empty: 
-                            continue
-                        curr = float(curr_s.iloc[-1])
-                        curr_date = curr_s.index[-1].date()
-                else:
-                    if curr_s.empty: 
-                        continue
-                    curr = float(curr_s.iloc[-1])
-                    curr_date = curr_s.index[-1].date()
-
-                b_date = curr_date - timedelta(days=1)
-                base_s = series[series.index.date <= b_date]
-                if ticker in open_df.columns:
-                    if (base_s.empty or base_s.index[-1].date() < b_date) and (not o_series[o_series.index.date == curr_date].empty):
-                        base = float(o_series[o_series.index.date == curr_date].iloc[-1])
-                        base_date = b_date
-                    else:
-                        base = float(base_s.iloc[-1]) if not base_s.empty else curr
-                        base_date = base_s.index[-1].date() if not base_s.empty else curr_date
-                else:
-                    base = float(base_s.iloc[-1]) if not base_s.empty else curr
-                    base_date = base_s.index[-1].date() if not base_s.empty else curr_date
-
-                change = ((curr - base) / base) * 100 if base > 0 else 0
-
-            elif cat in ['US Tech', 'Macro', 'Others']:
-                offset = 2 if kst_now.hour < 6 else 1
-                t_date = today_kst - timedelta(days=offset)
-                while t_date.weekday() > 4: 
-                    t_date -= timedelta(days=1)
-                
-                curr_s = series[series.index.date <= t_date]
-                if curr_s.empty: 
-                    continue
-                curr = float(curr_s.iloc[-1])
-                curr_date = curr_s.index[-1].date()
-                
-                base_s = series[series.index.date < curr_date]
-                base = float(base_s.iloc[-1]) if not base_s.empty else curr
-                change = ((curr - base) / base) * 100 if base > 0 else 0
-                base_date = base_s.index[-1].date() if not base_s.empty else curr_date
-            else:
-                offset = 1 if (kst_now.hour < 15 or (kst_now.hour == 15 and kst_now.minute < 30)) else 0
-                t_date = today_kst - timedelta(days=offset)
-                while t_date.weekday() > 4: 
-                    t_date -= timedelta(days=1)
-                
-                curr_s = series[series.index.date <= t_date]
-                if curr_s.empty: 
-                    continue
-                curr = float(curr_s.iloc[-1])
-                curr_date = curr_s.index[-1].date()
-                
-                base_s = series[series.index.date < curr_date]
-                base = float(base_s.iloc[-1]) if not base_s.empty else curr
-                change = ((curr - base) / base) * 100 if base > 0 else 0
-                base_date = base_s.index[-1].date() if not base_s.empty else curr_date
+        self.market = market
+        self.days = days.values.astype('datetime64[D]')
+        closes = (pd.DatetimeIndex(self.days) + pd.Timedelta(minutes=close_minutes)).tz_localize(tz, nonexistent='shift_forward', ambiguous=False)
+        self.close_ns = closes.tz_convert('UTC').tz_localize(None).values.astype('datetime64[ns]').astype('int64')
+        self._memo = None
+
+    def last_completed(self, now):
+        # now 시점까지 마감된 마지막 세션 날짜 (결과는 다음 마감 시각 전까지 재사용)
+        now_ns = pd.Timestamp(now).tz_convert('UTC').value
+        memo = self._memo
+        if memo and memo[0] <= now_ns < memo[1]:
+            return memo[2]
+        i = int(np.searchsorted(self.close_ns, now_ns, side='right')) - 1
+        result = self.days[i].astype(object) if i >= 0 else None
+        lo = self.close_ns[i] if i >= 0 else np.iinfo('int64').min
+        hi = self.close_ns[i + 1] if i + 1 < len(self.close_ns) else np.iinfo('int64').max
+        self._memo = (lo, hi, result)
+        return result
+
+    def next_close(self, now):
+        # now 이후 첫 마감 시각 (UTC Timestamp), 달력 범위 밖이면 None
+        now_ns = pd.Timestamp(now).tz_convert('UTC').value
+        i = int(np.searchsorted(self.close_ns, now_ns, side='right'))
+        return pd.Timestamp(int(self.close_ns[i]), tz='UTC') if i < len(self.close_ns) else None
+
+def session_cutoff_cases(year):
+    # 마감 기준 고정용 사례: (시장, KST 시각, 마지막 마감 세션) -- 1월(미 동부 표준시)·7월(서머타임) 수요일
+    jan = pd.Timestamp(year, 1, 14) + pd.Timedelta(days=(2 - pd.Timestamp(year, 1, 14).weekday()) % 7)
+    jul = pd.Timestamp(year, 7, 15) + pd.Timedelta(days=(2 - pd.Timestamp(year, 7, 15).weekday()) % 7)
+    at = lambda d, h, m=0: d + pd.Timedelta(hours=h, minutes=m)
+    day = pd.Timedelta(days=1)
+    return [
+        ('fx', at(jan, 5, 59), jan - 2 * day), ('fx', at(jan, 6), jan - day),            # V9.8과 같은 06:00 KST
+        ('fx', at(jul, 6), jul - day), ('fx', at(jan + 5 * day, 7), jan + 2 * day),       # 월요일 아침 = 금요일 세션
+        ('nyse', at(jan, 5, 59), jan - 2 * day), ('nyse', at(jan, 6), jan - day),
+        ('nyse', at(jul, 4, 59), jul - 2 * day), ('nyse', at(jul, 5), jul - day),
+        ('comex', at(jan, 6, 59), jan - 2 * day), ('comex', at(jan, 7), jan - day),      # 17:00 ET = 겨울 07:00 KST
+        ('comex', at(jul, 5, 59), jul - 2 * day), ('comex', at(jul, 6), jul - day),
+        ('krx', at(jan, 15, 29), jan - day), ('krx', at(jan, 15, 30), jan),
+        ('crypto', at(jan, 8, 59), jan - 2 * day), ('crypto', at(jan, 9), jan - day),
+    ]
+
+def check_session_cutoffs(year=None):
+    # 규칙 달력 기준으로 사례를 검사 -> 어긋난 (시장, KST 시각, 기대, 결과) 목록 (정상이면 빈 목록)
+    year = year or pd.Timestamp.now().year - 1
+    kst = pytz.timezone('Asia/Seoul')
+    calendars = {m: SessionCalendar(m) for m in MARKET_SESSIONS}
+    bad = []
+    for market, at, expected in session_cutoff_cases(year):
+        got = calendars[market].last_completed(kst.localize(at.to_pydatetime()))
+        if got != expected.date():
+            bad.append((market, at, expected.date(), got))
+    return bad
+
+# [V9.9] 벡터화 엔진: 프레임을 한 번만 datetime64/float 배열로 바꾸고, 기준일·현재일은 searchsorted로 일괄 조회
+def last_valid_rows(values):
+    # 각 행 시점까지의 마지막 유효(NaN 아님) 행 번호, 없으면 -1
+    rows = np.where(np.isnan(values), -1, np.arange(values.shape[0])[:, None])
+    return np.maximum.accumulate(rows, axis=0) if len(rows) else rows
+
+class PriceIndex:
+    def __init__(self, close_df, high_df, open_df):
+        if not close_df.index.is_monotonic_increasing:
+            close_df = close_df.sort_index()
+        self.tickers = list(close_df.columns)
+        self.col = {t: j for j, t in enumerate(self.tickers)}
+        self.dates = close_df.index.values.astype('datetime64[D]')
+        
+        # float32 패널 view를 그대로 사용 (결과값만 float64로 승격)
+        self.close = close_df.to_numpy()
+        self.open = open_df.reindex(index=close_df.index, columns=self.tickers).to_numpy()
+        self.has_open = np.array([t in open_df.columns for t in self.tickers], dtype=bool)
+        self.ath = high_df.max().reindex(self.tickers).to_numpy(dtype='float64') if not high_df.empty else np.full(len(self.tickers), np.nan)
+        
+        self.last_close = last_valid_rows(self.close)
+        self.last_open = last_valid_rows(self.open)
+        valid = ~np.isnan(self.close)
+        self.first_close = np.where(valid.any(axis=0), valid.argmax(axis=0), -1)
+        self._calendars = {}
+
+    def calendar(self, market, day):
+        # 시장별 세션 달력은 (시장, KST 날짜)당 한 번만 생성
+        key = (market, day)
+        if key not in self._calendars:
+            ref = MARKET_SESSIONS[market][2]
+            observed = None
+            if ref in self.col and not self.is_empty():
+                observed = pd.DatetimeIndex(self.dates[~np.isnan(self.close[:, self.col[ref]])])
+            self._calendars[key] = SessionCalendar(market, observed)
+        return self._calendars[key]
+
+    def last_completed(self, market, kst_now):
+        return self.calendar(market, kst_now.date()).last_completed(kst_now)
+
+    def is_empty(self):
+        return len(self.dates) == 0
+
+    def has_data(self, ticker):
+        j = self.col.get(ticker)
+        return j is not None and not self.is_empty() and self.last_close[-1, j] >= 0
+
+    def last_value(self, ticker, default):
+        if not self.has_data(ticker): 
+            return default
+        j = self.col[ticker]
+        return float(self.close[self.last_close[-1, j], j])
+
+    def rows_le(self, lv, js, targets):
+        pos = np.searchsorted(self.dates, targets, side='right') - 1
+        return np.where(pos >= 0, lv[np.maximum(pos, 0), js], -1)
+
+    def rows_lt(self, lv, js, targets):
+        pos = np.searchsorted(self.dates, targets, side='left') - 1
+        return np.where(pos >= 0, lv[np.maximum(pos, 0), js], -1)
+
+    def rows_on(self, lv, js, targets):
+        r = self.rows_le(lv, js, targets)
+        return np.where((r >= 0) & (self.dates[np.maximum(r, 0)] == targets), r, -1)
+
+def dt64_weekday(d):
+    return (d.astype('int64') + 3) % 7   # 1970-01-01 = 목요일
+
+def session_group(cat, ticker=''):
+    if cat == 'Crypto': 
+        return 'crypto'
+    if cat == 'K-Market': 
+        return 'krx'
+    if cat == 'Macro':
+        return 'fx' if any(m in ticker for m in FX_SESSION_MARKS) else 'comex'
+    return 'nyse'
+
+def pick(values, rows, js, fallback):
+    return np.where(rows >= 0, values[np.maximum(rows, 0), js], fallback)
+
+def resolve_completed_daily(pidx, js, group, kst_now):
+    dates = pidx.dates
+    last_session = pidx.last_completed(group, kst_now)
+    if last_session is None:
+        k = len(js)
+        nat = np.full(k, np.datetime64('NaT'), dtype='datetime64[D]')
+        return np.full(k, np.nan), np.full(k, np.nan), nat, nat.copy(), np.zeros(k, dtype=bool)
+    t_date = np.datetime64(last_session, 'D')
+    
+    if group == 'crypto':
+        tgt = np.full(len(js), t_date)
+        
+        ci = pidx.rows_le(pidx.last_close, js, tgt)
+        oi = pidx.rows_on(pidx.last_open, js, tgt + 1)
+        use_open = pidx.has_open[js] & ((ci < 0) | (dates[np.maximum(ci, 0)] < t_date)) & (oi >= 0)
+        ok = use_open | (ci >= 0)
+        curr = np.where(use_open, pidx.open[np.maximum(oi, 0), js], pick(pidx.close, ci, js, np.nan))
+        curr_date = np.where(use_open, tgt, dates[np.maximum(ci, 0)])
+        
+        b_date = curr_date - 1
+        bi = pidx.rows_le(pidx.last_close, js, b_date)
+        obi = pidx.rows_on(pidx.last_open, js, curr_date)
+        use_open_b = pidx.has_open[js] & ((bi < 0) | (dates[np.maximum(bi, 0)] < b_date)) & (obi >= 0)
+        base = np.where(use_open_b, pidx.open[np.maximum(obi, 0), js], pick(pidx.close, bi, js, curr))
+        base_date = np.where(use_open_b, b_date, np.where(bi >= 0, dates[np.maximum(bi, 0)], curr_date))
+        return curr, base, curr_date, base_date, ok
+        
+    ci = pidx.rows_le(pidx.last_close, js, np.full(len(js), t_date))
+    ok = ci >= 0
+    curr = pick(pidx.close, ci, js, np.nan)
+    curr_date = dates[np.maximum(ci, 0)]
+    bi = pidx.rows_lt(pidx.last_close, js, curr_date)
+    base = pick(pidx.close, bi, js, curr)
+    base_date = np.where(bi >= 0, dates[np.maximum(bi, 0)], curr_date)
+    return curr, base, curr_date, base_date, ok
+
+def resolve_prices(pidx, js, groups, status_mode, period, kst_now):
+    # 종목 배열 js 전체에 대해 (현재가, 기준가, 현재일, 기준일, 변동률, 유효여부)를 한 번에 계산
+    dates = pidx.dates
+    
+    if status_mode == 'ATH':
+        ci = pidx.last_close[-1, js]
+        ok = ci >= 0
+        curr = pick(pidx.close, ci, js, np.nan)
+        base = pidx.ath[js]
+        curr_date = dates[np.maximum(ci, 0)]
+        base_date = curr_date
+        
+    elif status_mode == 'Completed' and period == 'Daily':
+        k = len(js)
+        curr, base = np.full(k, np.nan), np.full(k, np.nan)
+        curr_date = np.full(k, np.datetime64('NaT'), dtype='datetime64[D]')
+        base_date = curr_date.copy()
+        ok = np.zeros(k, dtype=bool)
+        for group in MARKET_SESSIONS:
+            m = groups == group
+            if m.any():
+                curr[m], base[m], curr_date[m], base_date[m], ok[m] = resolve_completed_daily(pidx, js[m], group, kst_now)
                 
+    else:
+        if status_mode == 'Completed':
+            today = np.datetime64(kst_now.date(), 'D')
+            ci = pidx.rows_lt(pidx.last_close, js, np.full(len(js), today))
         else:
-            v_series = series[series.index.date < today_kst] if status_mode == 'Completed' else series 
-            if v_series.empty: 
-                continue
-            curr, curr_date = float(v_series.iloc[-1]), v_series.index[-1].date()
+            ci = pidx.last_close[-1, js]
+        ok = ci >= 0
+        curr = pick(pidx.close, ci, js, np.nan)
+        curr_date = dates[np.maximum(ci, 0)]
+        
+        if status_mode == 'Cycle':
+            days = {'Daily':1, 'Weekly':7, 'Monthly':30, 'Yearly':365}.get(period, 0)
+            bi = pidx.rows_le(pidx.last_close, js, curr_date - days)
+        elif period == 'Daily': 
+            bi = pidx.rows_lt(pidx.last_close, js, curr_date)
+        elif period == 'Weekly': 
+            bi = pidx.rows_lt(pidx.last_close, js, curr_date - dt64_weekday(curr_date))
+        elif period == 'Monthly': 
+            bi = pidx.rows_lt(pidx.last_close, js, curr_date.astype('datetime64[M]').astype('datetime64[D]'))
+        elif period == 'Yearly': 
+            bi = pidx.rows_lt(pidx.last_close, js, curr_date.astype('datetime64[Y]').astype('datetime64[D]'))
+        else: 
+            bi = pidx.first_close[js]
+            
+        base = pick(pidx.close, bi, js, curr)
+        base_date = np.where(bi >= 0, dates[np.maximum(bi, 0)], curr_date)
+        
+    curr, base = curr.astype('float64'), base.astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(base > 0, ((curr - base) / base) * 100, 0)
+    return curr, base, curr_date, base_date, change, ok
+
+# [V9.9] 자산 분류 규칙 단일화: (카테고리, 이름 집합, 티커 표식) 순서대로 첫 일치 -> 없으면 알파벳 대문자 티커는 US Tech
+CATEGORY_RULES = [
+    ('Real Estate', frozenset(['Seoul APT']), ()),
+    ('K-Market', frozenset(['Samsung', 'SK Hynix', 'KOSPI', 'TIGER 200', 'HLB', 'HL만도']), ('.KS', '.KQ', '^KS')),
+    ('Crypto', frozenset(['BTC', 'ETH']), ('-USD',)),
+    ('Macro', frozenset(['Gold', 'Silver', 'Copper', 'Dollar Index', 'USD/KRW', 'USO', 'BNO']), ('=F',)),
+    ('Others', frozenset(['TSMC', '비츠로테크']), ()),
+    ('US Tech', frozenset(['NASDAQ', 'S&P 500', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'AMZN', 'GOOG', 'AVGO', 'TSLA', 'META', 'PLTR', 'SpaceX', 'LLY', 'BRK-B']), ('^GSPC', '^IXIC')),
+]
+CATEGORY_GROUP_ORDER = ['Real Estate', 'US Tech', 'K-Market', 'Crypto', 'Macro', 'Others']
+
+def classify_asset(name, ticker):
+    for cat, names, marks in CATEGORY_RULES:
+        if name in names or any(m in ticker for m in marks):
+            return cat
+    if ticker.isalpha() and ticker.isupper():
+        return 'US Tech'
+    return 'Others'
+
+# 유니버스(이름, 티커) 전체를 한 번에 분류해 두는 색인 -> 포트폴리오가 바뀔 때만 다시 생성
+class AssetClassifier:
+    def __init__(self, universe):
+        self.categories = {(name, ticker): classify_asset(name, ticker) for name, ticker in universe}
+        
+    def category(self, name, ticker):
+        cat = self.categories.get((name, ticker))
+        if cat is None:
+            cat = self.categories[(name, ticker)] = classify_asset(name, ticker)
+        return cat
+        
+    def groups(self, name_map):
+        # 사이드바용 {카테고리: [이름...]} (입력 순서 유지)
+        out = {cat: [] for cat in CATEGORY_GROUP_ORDER}
+        for name, ticker in name_map.items():
+            out[self.category(name, ticker)].append(name)
+        return out
+
+@st.cache_resource(max_entries=4)
+def get_classifier(universe):
+    return AssetClassifier(universe)
+
+def calc_mcap(name, price, cat, usd_krw):
+    return ((price * SHARES_B[name]) / (usd_krw if cat == 'K-Market' else 1)) / 1000 if name in SHARES_B else 0
+
+# Market Overview 사이드바 선택지 (ATH는 기간 선택 없이 'All' 고정 -> 제목도 "... All")
+OVERVIEW_STATUSES = ('Live', 'Completed', 'Cycle', 'ATH')
+OVERVIEW_PERIODS = ('Daily', 'Weekly', 'Monthly', 'Yearly')
+ATH_PERIOD = 'All'
+
+def overview_periods(status):
+    return (ATH_PERIOD,) if status == 'ATH' else OVERVIEW_PERIODS
+
+# [V9.9] 시장 스냅샷 큐브: 데이터 갱신 1회당 (티커, Status, Period) 전 조합을 미리 계산 -> 사이드바 전환은 조회만
+# 조합 = 사이드바에서 고를 수 있는 (Status, Period) 전부 (배치 렌더러도 같은 목록 사용)
+SNAPSHOT_COMBOS = [(s, p) for s in OVERVIEW_STATUSES for p in overview_periods(s)]
+
+def frame_token(*frames):
+    # 갱신 식별용 가벼운 해시 (저장소 보충은 꼬리 구간만 바꾸므로 shape + 마지막 5행이면 충분)
+    parts = []
+    for df in frames:
+        parts.append(f"{df.shape}|{','.join(map(str, df.columns))}")
+        if not df.empty:
+            parts.append(f"{df.index[0]}|{pd.util.hash_pandas_object(df.tail(5), index=True).sum()}")
+    return hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
+def snapshot_clock_key(kst_now, pidx):
+    # Completed 결과가 바뀌는 시점 = 날짜 변경 또는 시장별 마지막 마감 세션 변경
+    return (kst_now.date().isoformat(),) + tuple(str(pidx.last_completed(m, kst_now)) for m in MARKET_SESSIONS)
+
+class MarketSnapshot:
+    def __init__(self, pidx, universe, kst_now):
+        self.pidx = pidx
+        self.kst_now = kst_now
+        self.usd_krw = pidx.last_value('KRW=X', 1350.0)
+        self.classifier = get_classifier(universe)
+        
+        canon = {}
+        for name, ticker in universe:
+            if ticker not in canon and pidx.has_data(ticker):
+                canon[ticker] = (name, self.classifier.category(name, ticker))
+        tickers = list(canon.keys())
+        self.rows = {}
+        if not tickers:
+            return
             
-            if status_mode == 'Cycle':
-                t_base = curr_date - timedelta(days={'Daily':1, 'Weekly':7, 'Monthly':30, 'Yearly':365}.get(period, 0))
-                b_series = series[series.index.date <= t_base]
+        js = np.array([pidx.col[t] for t in tickers])
+        groups = np.array([session_group(cat, t) for t, (_, cat) in canon.items()])
+        for status, period in SNAPSHOT_COMBOS:
+            curr, _, curr_date, base_date, change, ok = resolve_prices(pidx, js, groups, status, period, kst_now)
+            curr_dates, base_dates = curr_date.astype(object), base_date.astype(object)
+            for i, t in enumerate(tickers):
+                self.rows[(t, status, period)] = (groups[i], bool(ok[i]), float(curr[i]), float(change[i]), curr_dates[i], base_dates[i])
+
+    def lookup(self, items, status, period):
+        # 큐브에 없거나 세션 규칙이 다른 항목만 즉석 계산
+        key_period = ATH_PERIOD if status == 'ATH' else period
+        out, missing = {}, []
+        for i, (name, ticker, cat) in enumerate(items):
+            row = self.rows.get((ticker, status, key_period))
+            if row is None or row[0] != session_group(cat, ticker):
+                missing.append(i)
             else:
-                if period == 'Daily': 
-                    b_series = series[series.index.date < curr_date]
-                elif period == 'Weekly': 
-                    b_series = series[series.index.date < (datetime.combine(curr_date, datetime.min.time()) - timedelta(days=curr_date.weekday())).date()]
-                elif period == 'Monthly': 
-                    b_series = series[series.index.date < curr_date.replace(day=1)]
-                elif period == 'Yearly': 
-                    b_series = series[series.index.date < curr_date.replace(month=1, day=1)]
-                else: 
-                    b_series = series.iloc[0:1]
+                out[i] = row[1:]
                 
-            base = float(b_series.iloc[-1]) if not b_series.empty else curr
-            change = ((curr - base) / base) * 100 if base > 0 else 0
-            base_date = b_series.index[-1].date() if not b_series.empty else curr_date
+        if missing:
+            js = np.array([self.pidx.col[items[i][1]] for i in missing])
+            groups = np.array([session_group(items[i][2], items[i][1]) for i in missing])
+            curr, _, curr_date, base_date, change, ok = resolve_prices(self.pidx, js, groups, status, period, self.kst_now)
+            for k, i in enumerate(missing):
+                out[i] = (bool(ok[k]), float(curr[k]), float(change[k]), curr_date[k].astype(object), base_date[k].astype(object))
+        return [out[i] for i in range(len(items))]
+
+@st.cache_resource(max_entries=4)
+def get_price_index(data_token, _close_df, _high_df, _open_df):
+    return PriceIndex(_close_df, _high_df, _open_df)
+
+@st.cache_resource(max_entries=8)
+def get_market_snapshot(data_token, clock_key, universe, _price_index, _kst_now):
+    return MarketSnapshot(_price_index, universe, _kst_now)
+
+def process_data(target_names, period, status_mode, close_df, high_df, open_df, custom_mapping=None, price_index=None, snapshot=None, classifier=None):
+    if custom_mapping is None: 
+        custom_mapping = {}
+    if snapshot is not None:
+        pidx = snapshot.pidx
+    else:
+        pidx = price_index if price_index is not None else PriceIndex(close_df, high_df, open_df)
+    if pidx.is_empty(): 
+        return pd.DataFrame()
+    if classifier is None:
+        classifier = snapshot.classifier if snapshot is not None else AssetClassifier(())
+
+    items = []
+    for name in target_names:
+        ticker = TICKERS.get(name) or custom_mapping.get(name)
+        if not ticker or not pidx.has_data(ticker): 
+            continue
+        items.append((name, ticker, classifier.category(name, ticker)))
         
-        mcap = ((curr * SHARES_B[name]) / (usd_krw if cat == 'K-Market' else 1)) / 1000 if name in SHARES_B else 0
+    if not items: 
+        return pd.DataFrame()
+        
+    if snapshot is not None:
+        usd_krw = snapshot.usd_krw
+        resolved = snapshot.lookup(items, status_mode, period)
+    else:
+        usd_krw = pidx.last_value('KRW=X', 1350.0)
+        js = np.array([pidx.col[t] for _, t, _ in items])
+        groups = np.array([session_group(cat, t) for _, t, cat in items])
+        curr, _, curr_date, base_date, change, ok = resolve_prices(pidx, js, groups, status_mode, period, get_korea_time())
+        resolved = [(bool(ok[i]), float(curr[i]), float(change[i]), curr_date[i].astype(object), base_date[i].astype(object)) for i in range(len(items))]
+    
+    res = []
+    for (name, _, cat), (ok, price, change, curr_date, base_date) in zip(items, resolved):
+        if not ok: 
+            continue
         res.append({
             'name': name, 
-            'price': curr, 
+            'price': price, 
             'change': change, 
             'category': cat, 
             'curr_date': curr_date, 
             'base_date': base_date, 
-            'mcap': mcap
+            'mcap': calc_mcap(name, price, cat, usd_krw)
         })
         
     return pd.DataFrame(res)
@@ -439,6 +1178,294 @@ def sort_by_category(df):
     df['name_rank'] = df['name'].map(name_order).fillna(99)
     return df.sort_values(['cat_rank', 'name_rank', 'name']).drop(['cat_rank', 'name_rank'], axis=1).reset_index(drop=True)
 
+# [V9.9] 기술적 지표 엔진: 데이터 갱신 1회당 전 종목 지표를 한 번에 계산 -> Deep Dive는 잘라 쓰기만
+# 종목마다 거래일이 달라(국장/미장/24시간 코인) 합집합 날짜축 그대로 rolling 하면 빈 칸이 섞임
+# -> 종목별 유효 봉만 모아 마지막 봉을 맞춘(오른쪽 정렬) 밀집 행렬로 만든 뒤 열 단위로 일괄 계산
+INDICATOR_SMA_WINDOWS = (50, 120, 200)
+INDICATOR_RSI_PERIOD = 14
+INDICATOR_MACD = (12, 26, 9)       # (fast, slow, signal)
+INDICATOR_BB = (20, 2.0)           # (기간, 표준편차 배수)
+INDICATOR_ATR_PERIOD = 14
+
+def pack_right_aligned(close):
+    # src[k, j] = 종목 j의 (끝에서 맞춘) k번째 유효 봉이 있는 원래 날짜 행, 없으면 -1
+    valid = ~np.isnan(close)
+    counts = valid.sum(axis=0)
+    n = int(counts.max()) if counts.size else 0
+    dest = np.cumsum(valid, axis=0) - 1 + (n - counts)
+    src = np.full((n, close.shape[1]), -1, dtype=np.int64)
+    rows, cols = np.nonzero(valid)
+    src[dest[rows, cols], cols] = rows
+    return src, counts
+
+def compute_indicators(close, high, low):
+    # 입력: (봉, 종목) float64 DataFrame -> {지표명: float32 배열}
+    out = {}
+    for w in INDICATOR_SMA_WINDOWS:
+        out[f'SMA{w}'] = close.rolling(w).mean()
+        
+    fast, slow, signal = INDICATOR_MACD
+    out[f'EMA{fast}'] = close.ewm(span=fast, adjust=False).mean()
+    out[f'EMA{slow}'] = close.ewm(span=slow, adjust=False).mean()
+    out['MACD'] = out[f'EMA{fast}'] - out[f'EMA{slow}']
+    out['MACD_SIGNAL'] = out['MACD'].ewm(span=signal, adjust=False).mean()
+    out['MACD_HIST'] = out['MACD'] - out['MACD_SIGNAL']
+    
+    # Wilder 평활 = alpha 1/n 지수이동평균
+    p = INDICATOR_RSI_PERIOD
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / p, adjust=False, min_periods=p).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / p, adjust=False, min_periods=p).mean()
+    out[f'RSI{p}'] = 100 - (100 / (1 + (gain / loss)))
+    
+    w, k = INDICATOR_BB
+    std = close.rolling(w).std(ddof=0)
+    out['BB_MID'] = close.rolling(w).mean()
+    out['BB_UPPER'] = out['BB_MID'] + k * std
+    out['BB_LOWER'] = out['BB_MID'] - k * std
+    
+    a = INDICATOR_ATR_PERIOD
+    prev_close = close.shift(1)
+    tr = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+    out[f'ATR{a}'] = tr.ewm(alpha=1 / a, adjust=False, min_periods=a).mean()
+    return {name: df.to_numpy(dtype=np.float32) for name, df in out.items()}
+
+class IndicatorPanel:
+    def __init__(self, panel, stored=None):
+        self.dates = panel.dates
+        self.tickers = list(panel.tickers)
+        self.col = {t: j for j, t in enumerate(self.tickers)}
+        self.src, self.counts = pack_right_aligned(panel.values[PANEL_FIELD_IX['Close']])
+        self.n = self.src.shape[0]
+        
+        has = self.src >= 0
+        rows = np.where(has, self.src, 0)
+        cols = np.arange(len(self.tickers))
+        dense = {}
+        for field in PANEL_FIELDS:
+            v = panel.values[PANEL_FIELD_IX[field]][rows, cols].astype('float64')
+            v[~has] = np.nan
+            dense[field] = pd.DataFrame(v)
+        self.values = {field: df.to_numpy(dtype=np.float32) for field, df in dense.items()}
+        
+        # 저장소에 증분 계산된 지표가 있으면 그대로 배치, 없는(또는 날짜가 안 맞는) 종목만 일괄 계산
+        shape = (self.n, len(self.tickers))
+        missing = []
+        for j, t in enumerate(self.tickers):
+            f = (stored or {}).get(t)
+            lo = self.n - int(self.counts[j])
+            index = self.dates[self.src[lo:, j]]
+            if f is None or not index.isin(f.index).all():
+                missing.append(j)
+                continue
+            f = f.reindex(index)
+            for name in f.columns:
+                self.values.setdefault(name, np.full(shape, np.nan, dtype=np.float32))[lo:, j] = f[name].to_numpy()
+        if missing:
+            computed = compute_indicators(dense['Close'][missing], dense['High'][missing], dense['Low'][missing])
+            for name, arr in computed.items():
+                self.values.setdefault(name, np.full(shape, np.nan, dtype=np.float32))[:, missing] = arr
+
+    def frame(self, ticker):
+        # 종목 하나의 OHLCV + 전 지표 (유효 봉만, float64)
+        j = self.col.get(ticker)
+        if j is None or self.counts[j] == 0:
+            return pd.DataFrame()
+        lo = self.n - int(self.counts[j])
+        index = self.dates[self.src[lo:, j]]
+        return pd.DataFrame({name: v[lo:, j].astype('float64') for name, v in self.values.items()}, index=index)
+
+# [V9.9] 증분 지표: 확정 구간 끝(체크포인트)의 누적 상태 + 꼬리 구간만 다시 계산 -> 새 봉 N개 추가 비용 O(N)
+# 저장소 보충은 마지막 저장일 - STORE_OVERLAP_DAYS 이후만 덮어쓰므로 그 이전 봉은 확정 -> 체크포인트는 항상 확정 구간에 둠
+# 상태는 <티커>.ind.json, 지표 시계열은 <티커>.ind.parquet 로 가격 저장소 옆에 보관
+INDICATOR_SUM_WINDOWS = tuple(sorted(set(INDICATOR_SMA_WINDOWS) | {INDICATOR_BB[0]}))
+INDICATOR_BUFFER = max(INDICATOR_SUM_WINDOWS)
+
+def ewm_step(s, x, alpha, min_periods):
+    # pandas ewm(adjust=False, ignore_na=False) 점화식 한 단계, s = [평균, old_wt, 관측 수]
+    obs = x == x
+    s[2] += obs
+    if s[0] == s[0]:
+        s[1] *= 1.0 - alpha
+        if obs:
+            if s[0] != x:
+                s[0] = (s[1] * s[0] + alpha * x) / (s[1] + alpha)
+            s[1] = 1.0
+    elif obs:
+        s[0] = x
+    return s[0] if s[2] >= max(min_periods, 1) else np.nan
+
+class IndicatorStream:
+    EWM_KEYS = ('ema_fast', 'ema_slow', 'signal', 'gain', 'loss', 'atr')
+    
+    def __init__(self, state=None):
+        state = state or {}
+        self.window = deque(state.get('window', []), maxlen=INDICATOR_BUFFER)
+        self.ewm = {k: list(state.get('ewm', {}).get(k, [np.nan, 1.0, 0])) for k in self.EWM_KEYS}
+        self.prev_close = state.get('prev_close', np.nan)
+        # 이동합은 버퍼에서 다시 계산 -> 저장/복원 사이 누적 오차가 쌓이지 않음
+        buf = list(self.window)
+        self.sums = {w: float(sum(buf[-w:])) for w in INDICATOR_SUM_WINDOWS}
+
+    def step(self, high, low, close):
+        for w in INDICATOR_SUM_WINDOWS:
+            if len(self.window) >= w:
+                self.sums[w] -= self.window[-w]
+            self.sums[w] += close
+        self.window.append(close)
+        n = len(self.window)
+        row = {f'SMA{w}': self.sums[w] / w if n >= w else np.nan for w in INDICATOR_SMA_WINDOWS}
+        
+        fast, slow, signal = INDICATOR_MACD
+        row[f'EMA{fast}'] = ewm_step(self.ewm['ema_fast'], close, 2 / (fast + 1), 0)
+        row[f'EMA{slow}'] = ewm_step(self.ewm['ema_slow'], close, 2 / (slow + 1), 0)
+        row['MACD'] = row[f'EMA{fast}'] - row[f'EMA{slow}']
+        row['MACD_SIGNAL'] = ewm_step(self.ewm['signal'], row['MACD'], 2 / (signal + 1), 0)
+        row['MACD_HIST'] = row['MACD'] - row['MACD_SIGNAL']
+        
+        p = INDICATOR_RSI_PERIOD
+        delta = close - self.prev_close
+        gain = ewm_step(self.ewm['gain'], max(delta, 0.0) if delta == delta else np.nan, 1 / p, p)
+        loss = ewm_step(self.ewm['loss'], max(-delta, 0.0) if delta == delta else np.nan, 1 / p, p)
+        if loss == 0:
+            row[f'RSI{p}'] = 100.0 if gain > 0 else np.nan
+        else:
+            row[f'RSI{p}'] = 100 - (100 / (1 + (gain / loss)))
+        
+        w, k = INDICATOR_BB
+        if n >= w:
+            mid = self.sums[w] / w
+            std = float(np.std(np.fromiter(islice(reversed(self.window), w), dtype=float)))
+            row['BB_MID'], row['BB_UPPER'], row['BB_LOWER'] = mid, mid + k * std, mid - k * std
+        else:
+            row['BB_MID'] = row['BB_UPPER'] = row['BB_LOWER'] = np.nan
+        
+        a = INDICATOR_ATR_PERIOD
+        tr = np.fmax(high - low, np.fmax(abs(high - self.prev_close), abs(low - self.prev_close)))
+        row[f'ATR{a}'] = ewm_step(self.ewm['atr'], float(tr), 1 / a, a)
+        
+        self.prev_close = close
+        return row
+
+    def state(self, date, close):
+        return {'date': date.strftime('%Y-%m-%d'), 'close': close, 'window': list(self.window),
+                'ewm': {k: list(s) for k, s in self.ewm.items()}, 'prev_close': self.prev_close}
+
+def indicator_paths(ticker):
+    base = os.path.join(STORE_DIR, quote(ticker, safe=''))
+    return base + ".ind.parquet", base + ".ind.json"
+
+def read_indicator_store(ticker):
+    ind_path, state_path = indicator_paths(ticker)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return pd.read_parquet(ind_path), state
+    except Exception:
+        return None, None
+
+def update_indicator_store(ticker, prices):
+    # prices = 저장소에 방금 쓴 전체 일봉 -> 체크포인트 이후만 이어서 계산 (확정 구간이 바뀌었으면 처음부터)
+    old, state = read_indicator_store(ticker)
+    if state is not None:
+        ck = pd.Timestamp(state['date'])
+        if ck in prices.index and ck in old.index and prices.at[ck, 'Close'] == state['close']:
+            old, tail = old[old.index <= ck], prices[prices.index > ck]
+        else:
+            state = None
+    if state is None:
+        old, tail = None, prices
+        
+    settle = prices.index.max() - timedelta(days=STORE_OVERLAP_DAYS)
+    settled = np.flatnonzero(tail.index < settle)
+    last_settled = settled[-1] if len(settled) else -1
+    
+    stream = IndicatorStream(state)
+    rows = []
+    for i, (date, high, low, close) in enumerate(zip(tail.index, tail['High'], tail['Low'], tail['Close'])):
+        rows.append(stream.step(float(high), float(low), float(close)))
+        if i == last_settled:
+            state = stream.state(date, float(close))
+            
+    new = pd.DataFrame(rows, index=tail.index)
+    ind = new if old is None else pd.concat([old, new])
+    ind_path, state_path = indicator_paths(ticker)
+    ind.to_parquet(ind_path + ".tmp")
+    os.replace(ind_path + ".tmp", ind_path)
+    if state is not None:
+        with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(state_path + ".tmp", state_path)
+
+def load_indicator_frames(tickers):
+    frames = {}
+    for t in tickers:
+        ind, _ = read_indicator_store(t)
+        if ind is not None:
+            frames[t] = ind
+    return frames
+
+@st.cache_resource(max_entries=4)
+def get_indicator_panel(data_token, _panel):
+    return IndicatorPanel(_panel, load_indicator_frames(_panel.tickers))
+
+# [V9.9] Trend Analysis 주기별 마지막 값 패널: 데이터 갱신당 한 번 전 종목(+ 서울 아파트) 일괄 리샘플 -> 차트는 열 선택만
+TREND_PERIOD_RULES = {'Weekly': 'W', 'Monthly': 'ME', 'Yearly': 'YE'}
+
+def real_estate_daily(df_re, start, end):
+    # 주간 지수 -> 일별 달력 (관측치 사이 선형 보간, 마지막 관측 이후 ffill, 첫 관측 이전 bfill)
+    daily_idx = pd.date_range(start=min(start, df_re.index.min()), end=end, freq='D')
+    series = df_re.iloc[:, 0].reindex(daily_idx)
+    series = series.interpolate(method='linear', limit_area='inside')
+    return series.ffill().bfill()
+
+class TrendPanels:
+    def __init__(self, close_df, df_re=None, re_backfill_from=None):
+        # re_backfill_from: 기준일이 아파트 지수 첫 관측(2008) 이전이면 그 날까지 첫 값으로 채움 (V9.8과 같은 수평 구간)
+        daily = close_df
+        if df_re is not None and not df_re.empty:
+            if close_df.empty:
+                start, end = df_re.index.min(), pd.Timestamp.today().normalize()
+            else:
+                start, end = close_df.index.min(), close_df.index.max()
+            if re_backfill_from is not None:
+                start = min(start, re_backfill_from)
+            daily = close_df.join(real_estate_daily(df_re, start, end).rename('REAL_ESTATE'), how='outer')
+            
+        # 구간별 마지막 값 + 그 값의 실제 관측일 (기준일 이후 관측이 없는 구간은 차트에서 제외)
+        stamps = pd.DataFrame(
+            np.broadcast_to(daily.index.values[:, None], daily.shape), index=daily.index, columns=daily.columns
+        ).where(daily.notna())
+        self.values = {'Daily': daily}
+        self.observed = {'Daily': stamps}
+        for period, rule in TREND_PERIOD_RULES.items():
+            self.values[period] = daily.resample(rule).last()
+            self.observed[period] = stamps.resample(rule).last()
+            
+        # 로그 가격으로 보관 -> 기준일을 옮겨도 뺄셈 한 번 (0 이하 가격은 수익률 정의 불가 -> NaN)
+        self.log_prices = {}
+        self.observed_ns = {}
+        for period, values in self.values.items():
+            v = values.to_numpy(dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.log_prices[period] = np.log(np.where(v > 0, v, np.nan))
+            self.observed_ns[period] = self.observed[period].to_numpy(dtype='datetime64[ns]')
+
+    def rebased(self, period, base_dt):
+        # 누적 수익률(%) 행렬 (날짜 x 종목): 종목마다 기준일 이후 첫 관측값 = 0%
+        # (기준일에 값이 없는 종목은 그 뒤 첫 거래일부터 시작, 구간 값은 기준일 이후 관측분만 사용)
+        logp = self.log_prices[period]
+        valid = (self.observed_ns[period] >= np.datetime64(pd.Timestamp(base_dt), 'ns')) & ~np.isnan(logp)
+        cols = np.arange(logp.shape[1])
+        base = logp[valid.argmax(axis=0), cols]
+        base[~valid.any(axis=0)] = np.nan
+        out = np.where(valid, np.expm1(logp - base) * 100, np.nan)
+        return pd.DataFrame(out, index=self.values[period].index, columns=self.values[period].columns)
+
+@st.cache_resource(max_entries=4)
+def get_trend_panels(data_token, re_token, re_backfill_from, _close_df, _df_re):
+    return TrendPanels(_close_df, _df_re, re_backfill_from)
+
 # ==========================================
 # 3. Chart Drawing 
 # ==========================================
@@ -463,77 +1490,156 @@ def style_axes(ax):
     ax.tick_params(axis='y', labelsize=8)
     ax.yaxis.set_major_locator(mticker.MaxNLocator(nbins=4, prune='both'))
 
-def draw_top13_chart(df, main_title, sub_title, is_ath=False):
-    if df.empty: 
-        return
-    if is_ath:
-        draw_normal_chart(df, main_title, sub_title)
-        return
+# [V9.9] 렌더링 결과(PNG) 캐시: 같은 데이터·제목·모드면 matplotlib을 거치지 않고 바이트만 재사용 (LRU)
+CHART_CACHE_SIZE = 64
+CHART_KEY_COLS = ['name', 'category', 'mcap', 'change', 'curr_date']
+CHART_SAVE_KWARGS = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
 
-    df['plot_name'] = df['name'].str.replace(' ', '\n', n=1)
-    fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True, figsize=(10, 4.5), gridspec_kw={'height_ratios': [1, 3]})
-    fig.subplots_adjust(hspace=0.05)
-    fig.patch.set_facecolor('white')
+@st.cache_resource
+def get_chart_cache():
+    # pyplot 전역 상태는 스레드 안전하지 않음 -> 렌더링은 render_lock으로 직렬화
+    return {'lock': threading.Lock(), 'render_lock': threading.Lock(), 'items': OrderedDict(), 'hits': 0, 'misses': 0}
 
-    colors = [CATEGORY_COLORS.get(c, '#777777') for c in df['category']]
-    ax1.bar(df['plot_name'], df['mcap'], color=colors, width=0.6)
-    ax2.bar(df['plot_name'], df['mcap'], color=colors, width=0.6)
-    
-    # [V9.8 수술] 위쪽 차트(ax1) Y축 범위를 '금 시총 ±5%'로 자동 연동 방어
-    gold_row = df[df['name'] == 'Gold']
-    if not gold_row.empty:
-        gold_mcap = gold_row['mcap'].values[0]
-        ax1.set_ylim(gold_mcap * 0.95, gold_mcap * 1.05)
-    else:
-        max_top_mcap = df[df['mcap'] > 10]['mcap'].max() if not df[df['mcap'] > 10].empty else 34
-        ax1_upper = int(np.ceil(max_top_mcap * 1.25))
-        ax1.set_ylim(10, ax1_upper)
+def chart_key(kind, df, main_title, sub_title):
+    cols = [c for c in CHART_KEY_COLS if c in df.columns]
+    digest = pd.util.hash_pandas_object(df[cols], index=False).values.tobytes()
+    return hashlib.md5(f"{kind}|{main_title}|{sub_title}|{','.join(cols)}|".encode('utf-8') + digest).hexdigest()
 
-    ax2.set_ylim(int(np.floor((df[df['mcap'] < 20]['mcap'].min() if not df[df['mcap'] < 20].empty else 0))), (df[df['mcap'] < 20]['mcap'].max() if not df[df['mcap'] < 20].empty else 5.5) + 1.5)
-    
-    style_axes(ax1)
-    style_axes(ax2)
-    ax1.spines['bottom'].set_visible(False)
-    ax2.spines['top'].set_visible(False)
-    ax1.xaxis.set_visible(False)
+def figure_png(fig):
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, **CHART_SAVE_KWARGS)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+def render_chart_png(kind, render, df, main_title, sub_title):
+    cache = get_chart_cache()
+    key = chart_key(kind, df, main_title, sub_title)
+    with cache['lock']:
+        png = cache['items'].get(key)
+        if png is not None:
+            cache['items'].move_to_end(key)
+            cache['hits'] += 1
+            return png
+        cache['misses'] += 1
+        
+    with cache['render_lock']:
+        png = render(df, main_title, sub_title)
+            
+    with cache['lock']:
+        cache['items'][key] = png
+        while len(cache['items']) > CHART_CACHE_SIZE:
+            cache['items'].popitem(last=False)
+    return png
+
+# [V9.9] Top 12 차트 템플릿: 축·물결·제목 틀은 막대 개수별로 한 번만 만들고, 막대 높이/색·라벨·Y범위만 제자리 갱신
+# 이 2단(끊어진 축) 구성에서는 tight_layout이 적용되지도 않으면서 매번 비용만 큼 -> 여백을 고정하고 전체 캔버스 저장
+TOP13_LAYOUT = {'left': 0.07, 'right': 0.98, 'bottom': 0.10, 'top': 0.86, 'hspace': 0.05}
+TOP13_SAVE_KWARGS = {'format': 'png', 'dpi': 200}
+
+class Top13Template:
+    def __init__(self, n):
+        self.n = n
+        self.fig = Figure(figsize=(10, 4.5))
+        self.fig.patch.set_facecolor('white')
+        self.ax1, self.ax2 = self.fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [1, 3]})
+        self.fig.subplots_adjust(**TOP13_LAYOUT)
+        
+        x = np.arange(n)
+        self.bars = [ax.bar(x, np.zeros(n), width=0.6) for ax in (self.ax1, self.ax2)]
+        # 범주형 막대축과 같은 x 범위 (양끝 막대 반폭 + 5% 여백)
+        pad = (n - 0.4) * 0.05
+        self.ax2.set_xlim(-0.3 - pad, n - 0.7 + pad)
+        self.ax2.set_xticks(x)
+        
+        style_axes(self.ax1)
+        style_axes(self.ax2)
+        self.ax1.spines['bottom'].set_visible(False)
+        self.ax2.spines['top'].set_visible(False)
+        self.ax1.xaxis.set_visible(False)
+
+        wave_x = np.linspace(0, 1, 100)
+        self.ax1.plot(wave_x, np.sin(20 * np.pi * wave_x) * 0.008, transform=self.ax1.transAxes, color='#CCCCCC', lw=1.5, clip_on=False)
+        self.ax2.plot(wave_x, 1 + np.sin(20 * np.pi * wave_x) * 0.008, transform=self.ax2.transAxes, color='#CCCCCC', lw=1.5, clip_on=False)
+        
+        # 막대마다 위/아래 축 라벨을 하나씩 만들어 두고 시총에 따라 한쪽만 표시
+        self.labels = [
+            [ax.text(i, 0, '', ha='center', va='bottom', fontsize=8, fontweight='bold', visible=False) for i in range(n)]
+            for ax in (self.ax1, self.ax2)
+        ]
+        self.title = self.fig.text(0.50, 0.98, '', ha='center', va='top', fontsize=16, fontweight='bold', color='black')
+        self.subtitle = self.fig.text(0.50, 0.92, '', ha='center', va='top', fontsize=12, color='gray')
+
+    def update(self, df, main_title, sub_title):
+        ax1, ax2 = self.ax1, self.ax2
+        colors = [CATEGORY_COLORS.get(c, '#777777') for c in df['category']]
+        for bars in self.bars:
+            for rect, h, c in zip(bars, df['mcap'], colors):
+                rect.set_height(h)
+                rect.set_facecolor(c)
+        
+        # [V9.8 수술] 위쪽 차트(ax1) Y축 범위를 '금 시총 ±5%'로 자동 연동 방어
+        gold_row = df[df['name'] == 'Gold']
+        if not gold_row.empty:
+            gold_mcap = gold_row['mcap'].values[0]
+            ax1.set_ylim(gold_mcap * 0.95, gold_mcap * 1.05)
+        else:
+            max_top_mcap = df[df['mcap'] > 10]['mcap'].max() if not df[df['mcap'] > 10].empty else 34
+            ax1_upper = int(np.ceil(max_top_mcap * 1.25))
+            ax1.set_ylim(10, ax1_upper)
 
-    wave_x = np.linspace(0, 1, 100)
-    ax1.plot(wave_x, np.sin(20 * np.pi * wave_x) * 0.008, transform=ax1.transAxes, color='#CCCCCC', lw=1.5, clip_on=False)
-    ax2.plot(wave_x, 1 + np.sin(20 * np.pi * wave_x) * 0.008, transform=ax2.transAxes, color='#CCCCCC', lw=1.5, clip_on=False)
+        ax2.set_ylim(int(np.floor((df[df['mcap'] < 20]['mcap'].min() if not df[df['mcap'] < 20].empty else 0))), (df[df['mcap'] < 20]['mcap'].max() if not df[df['mcap'] < 20].empty else 5.5) + 1.5)
+        ax2.set_xticklabels(df['name'].str.replace(' ', '\n', n=1))
 
-    max_abs_change = df['change'].abs().max() if not df.empty else 1.0
-    max_date = df['curr_date'].max() if not df.empty else None
+        max_abs_change = df['change'].abs().max() if not df.empty else 1.0
+        max_date = df['curr_date'].max() if not df.empty else None
 
-    for i, r in df.iterrows():
-        txt_col = get_text_color(r['change'])
-        pct_str = get_pct_str(r['change'], max_abs_change)
-        
-        date_str = ""
-        if max_date and r['curr_date'] < max_date:
-            date_str = f"\n({r['curr_date'].month}/{r['curr_date'].day})"
+        for i, (_, r) in enumerate(df.iterrows()):
+            txt_col = get_text_color(r['change'])
+            pct_str = get_pct_str(r['change'], max_abs_change)
             
-        lbl = f"{format_value_auto(r['mcap'])}T\n{pct_str}{date_str}"
-        (ax1 if r['mcap'] > 10 else ax2).text(i, r['mcap'] + (0.1 if r['mcap'] > 10 else 0.1), lbl, ha='center', va='bottom', fontsize=8, fontweight='bold', color=txt_col)
-
-    fig.text(0.50, 0.98, main_title, ha='center', va='top', fontsize=16, fontweight='bold', color='black')
-    fig.text(0.50, 0.92, f"({sub_title})", ha='center', va='top', fontsize=12, color='gray')
-    
-    lp = [mpatches.Patch(color=v, label=k) for k, v in CATEGORY_COLORS.items() if k in df['category'].values]
-    ax1.legend(handles=lp, loc='upper right', frameon=True, fontsize=8, facecolor='white', edgecolor='#CCCCCC', ncol=len(lp))
+            date_str = ""
+            if max_date and r['curr_date'] < max_date:
+                date_str = f"\n({r['curr_date'].month}/{r['curr_date'].day})"
+                
+            lbl = f"{format_value_auto(r['mcap'])}T\n{pct_str}{date_str}"
+            upper = r['mcap'] > 10
+            for on, txt in ((upper, self.labels[0][i]), (not upper, self.labels[1][i])):
+                txt.set_visible(on)
+                if on:
+                    txt.set_text(lbl)
+                    txt.set_position((i, r['mcap'] + 0.1))
+                    txt.set_color(txt_col)
+
+        self.title.set_text(main_title)
+        self.subtitle.set_text(f"({sub_title})")
         
-    plt.tight_layout(rect=[0, 0, 1, 0.90])
-    st.pyplot(fig)
+        lp = [mpatches.Patch(color=v, label=k) for k, v in CATEGORY_COLORS.items() if k in df['category'].values]
+        ax1.legend(handles=lp, loc='upper right', frameon=True, fontsize=8, facecolor='white', edgecolor='#CCCCCC', ncol=len(lp))
+        return self.fig
 
-def draw_normal_chart(df, main_title, sub_title):
-    if df.empty: 
-        return
-    
+@st.cache_resource
+def get_top13_templates():
+    return {'lock': threading.Lock(), 'templates': {}}
+
+def render_top13_png(df, main_title, sub_title):
+    store = get_top13_templates()
+    with store['lock']:
+        tpl = store['templates'].get(len(df))
+        if tpl is None:
+            tpl = store['templates'][len(df)] = Top13Template(len(df))
+        buf = io.BytesIO()
+        tpl.update(df, main_title, sub_title).savefig(buf, **TOP13_SAVE_KWARGS)
+        return buf.getvalue()
+
+def build_normal_figure(df, main_title, sub_title):
     fig, ax = plt.subplots(figsize=(10, 4.0))
     fig.patch.set_facecolor('white')
-    df['plot_name'] = df['name'].str.replace(' ', '\n', n=1)
+    plot_names = df['name'].str.replace(' ', '\n', n=1)
     
     colors = [CATEGORY_COLORS.get(c, '#777777') for c in df['category']]
-    bars = ax.bar(df['plot_name'], df['change'], color=colors, width=0.6)
+    bars = ax.bar(plot_names, df['change'], color=colors, width=0.6)
     ax.axhline(0, color='black', linewidth=1.0)
     
     style_axes(ax)
@@ -577,8 +1683,19 @@ def draw_normal_chart(df, main_title, sub_title):
     
     ax.set_ylim(df['change'].min() - absolute_padding, df['change'].max() + absolute_padding) 
     
-    plt.tight_layout(rect=[0, 0, 1, 0.88])
-    st.pyplot(fig)
+    fig.tight_layout(rect=[0, 0, 1, 0.88])
+    return fig
+
+def render_normal_png(df, main_title, sub_title):
+    return figure_png(build_normal_figure(df, main_title, sub_title))
+
+def top13_chart_png(df, main_title, sub_title, is_ath=False):
+    if is_ath:
+        return normal_chart_png(df, main_title, sub_title)
+    return render_chart_png('top13', render_top13_png, df, main_title, sub_title)
+
+def normal_chart_png(df, main_title, sub_title):
+    return render_chart_png('normal', render_normal_png, df, main_title, sub_title)
 
 def generate_twitter_text(df, title, date_str, is_top=False):
     txt = f"[{title}]\n({date_str})\n\n"
@@ -618,20 +1735,137 @@ def hex_to_rgba(hex_color, alpha):
         return f'rgba({r},{g},{b},{alpha})'
     return hex_color
 
-def calculate_pixel_width(text):
-    w = 0.0
-    for c in text:
-        if '\uac00' <= c <= '\ud7a3': # 한글
-            w += 16.0
-        elif '\u1100' <= c <= '\u11ff' or '\u3130' <= c <= '\u318f':
-            w += 16.0
-        elif c.isupper():
-            w += 10.0 
-        else: 
-            w += 8.5
-    return w
+# [V9.9] 브라우저로 보내는 점 수 제한: 화면 폭(px)보다 많은 점은 어차피 같은 픽셀에 겹침
+# 선 = LTTB(Largest-Triangle-Three-Buckets, 모양·극값 보존), 캔들 = 구간별 OHLC 합치기
+CHART_WIDTH_OPTIONS = (480, 800, 1280, 1920)
+DEFAULT_CHART_WIDTH = 1280
+CANDLE_MIN_PX = 3   # 캔들 하나가 구분되어 보이는 최소 폭
+DEEP_DIVE_MARGIN = dict(l=20, r=20, t=100, b=20)
+
+def lttb_indices(x, y, threshold):
+    # 첫/끝 점은 고정, 가운데는 threshold-2 개 구간마다 (이전 선택점, 다음 구간 평균)과 이루는 삼각형이 가장 큰 점 선택
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def downsample_series(series, max_points):
+    # NaN(지표 워밍업 구간 등)은 선에 안 그려지므로 빼고 줄임
+    series = series.dropna()
+    if not max_points or len(series) <= max_points:
+        return series
+    x = series.index.values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), max_points)]
+
+def downsample_ohlcv(df, max_bars):
+    # 연속 k봉 -> 1봉 (시가=첫, 고가=최대, 저가=최소, 종가=마지막, 거래량=합), 날짜는 구간 첫날
+    if not max_bars or len(df) <= max_bars:
+        return df
+    k = -(-len(df) // max_bars)
+    groups = np.arange(len(df)) // k
+    g = df.groupby(groups)
+    out = pd.DataFrame({
+        'Open': g['Open'].first(), 'High': g['High'].max(), 'Low': g['Low'].min(),
+        'Close': g['Close'].last(), 'Volume': g['Volume'].sum()
+    })
+    out.index = df.index[::k]
+    return out
+
+# [V9.9] 끝 라벨 배치용 차트 치수 (px): 그림 높이·여백은 아래 update_layout과 동일
+TREND_HEIGHT = 450
+TREND_MARGIN = dict(l=20, r=20, t=100, b=20)
+TREND_AXIS_PX = 70      # Y축 눈금 + 제목 폭
+LABEL_FONT = 11
+LABEL_MIN_FONT = 7      # 라벨이 많아 세로로 안 들어갈 때 줄일 하한
+LABEL_LINE_RATIO = 1.3  # 줄 높이 = 글자 크기 x 1.3
+LABEL_ARROW_PX = 10     # 선 끝 -> 라벨 지시선 길이
+LABEL_FILL = 0.85       # 라벨 스택이 차지할 수 있는 최대 세로 비율
+
+# [V9.9] 브라우저 쪽 기준일 이동: 가격 원본을 한 번만 보내고 확대/범위 선택 때 JS가 재계산 (서버 재실행 없음)
+# 화면 왼쪽 끝 이후 첫 점 = 0%, 끝 라벨은 label_layout과 같은 PAV 최소 간격 해로 다시 배치
+TREND_REBASE_JS = """
+(function() {
+    var gd = document.getElementById('{plot_id}');
+    var raw = __RAW__;
+    var gapRatio = __GAP__;
+    var busy = false;
+    function toMs(v) {
+        if (typeof v === 'number') return v;
+        v = String(v);
+        return Date.parse(v.length <= 10 ? v : v.replace(' ', 'T') + 'Z');
+    }
+    function isotonic(v) {
+        var m = [], w = [], n = [];
+        v.forEach(function(x) {
+            m.push(x); w.push(1); n.push(1);
+            while (m.length > 1 && m[m.length - 2] > m[m.length - 1]) {
+                var a = m.pop(), wa = w.pop(), na = n.pop(), k = m.length - 1;
+                m[k] = (m[k] * w[k] + a * wa) / (w[k] + wa); w[k] += wa; n[k] += na;
+            }
+        });
+        var out = [];
+        m.forEach(function(x, i) { for (var j = 0; j < n[i]; j++) out.push(x); });
+        return out;
+    }
+    function spread(ys, gap) {
+        var order = ys.map(function(_, i) { return i; }).sort(function(a, b) { return ys[a] - ys[b]; });
+        var fit = isotonic(order.map(function(i, k) { return ys[i] - k * gap; }));
+        var out = new Array(ys.length);
+        order.forEach(function(i, k) { out[i] = fit[k] + k * gap; });
+        return out;
+    }
+    function rebase(x0, x1) {
+        var names = gd.data.map(function(t) { return t.name; });
+        var ys = [], ends = [], lo = Infinity, hi = -Infinity;
+        names.forEach(function(name) {
+            var t = raw[name][0], p = raw[name][1];
+            var k = t.findIndex(function(v) { return v >= x0; });
+            if (k < 0) k = t.length - 1;
+            var y = p.map(function(v) { return (v / p[k] - 1) * 100; });
+            for (var j = k; j < t.length && t[j] <= x1; j++) { lo = Math.min(lo, y[j]); hi = Math.max(hi, y[j]); }
+            ys.push(y); ends.push(y[y.length - 1]);
+        });
+        if (!isFinite(lo)) return;
+        var gap = ((hi - lo) || 10) * gapRatio;
+        var pos = spread(ends, gap);
+        lo = Math.min(lo, Math.min.apply(null, pos) - gap / 2);
+        hi = Math.max(hi, Math.max.apply(null, pos) + gap / 2);
+        var anns = gd.layout.annotations.map(function(a) {
+            var i = names.indexOf(a.name);
+            return (i < 0 || !a.showarrow) ? a : Object.assign({}, a, {y: ends[i], ay: pos[i]});
+        });
+        busy = true;
+        Plotly.update(gd, {y: ys}, {annotations: anns, 'yaxis.range': [lo, hi]}).then(function() { busy = false; });
+    }
+    gd.on('plotly_relayout', function(ev) {
+        if (busy || !Object.keys(ev).some(function(k) { return k.indexOf('xaxis') === 0; })) return;
+        var r = gd.layout.xaxis.range;
+        rebase(toMs(r[0]), toMs(r[1]));
+    });
+})();
+"""
+
+def trend_rebase_html(fig, prices, gap_ratio):
+    # prices = {이름: 가격 시계열(차트에 그린 점과 같은 날짜)}
+    raw = {
+        name: [(s.index.values.astype('datetime64[ms]').astype(np.int64)).tolist(), s.astype(float).tolist()]
+        for name, s in prices.items()
+    }
+    script = TREND_REBASE_JS.replace('__RAW__', json.dumps(raw)).replace('__GAP__', repr(float(gap_ratio)))
+    return fig.to_html(include_plotlyjs='cdn', full_html=False, post_script=script, config={'responsive': True})
 
-def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, github_token):
+def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, github_token, classifier=None, max_points=None, chart_width=DEFAULT_CHART_WIDTH, client_rebase=False):
     if not targets:
         st.warning("비교할 항목을 하나 이상 선택해주세요.")
         return
@@ -656,52 +1890,36 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
     global_max_y = float('-inf')
     global_max_x_date = pd.Timestamp.min
 
-    for name in targets:
-        ticker = TICKERS.get(name) or custom_mapping.get(name)
+    resolved = [(name, TICKERS.get(name) or custom_mapping.get(name)) for name in targets]
+    df_re = None
+    if github_token and any(ticker == "REAL_ESTATE" for _, ticker in resolved):
+        df_re = fetch_github_real_estate(github_token)
+        if df_re is not None and not df_re.empty:
+            real_estate_last_date = df_re.index.max().date()
+    re_token = frame_token(df_re) if df_re is not None and not df_re.empty else None
+    # 기준일이 지수 첫 관측보다 앞설 때만 채움 시작일을 캐시 키에 넣음 (평소에는 패널 하나를 공유)
+    re_backfill_from = base_dt.normalize() if re_token and base_dt < df_re.index.min() else None
+    panels = get_trend_panels(frame_token(close_df), re_token, re_backfill_from, close_df, df_re if re_token else None)
+    returns = panels.rebased(period, base_dt)
+    client_prices = {}
+
+    for name, ticker in resolved:
         if not ticker: 
             continue
         
-        if ticker == "REAL_ESTATE":
-            if not github_token:
-                st.error("⚠️ 깃허브 토큰이 없습니다.")
-                continue
-            df_re = fetch_github_real_estate(github_token)
-            if df_re is None or df_re.empty: 
-                continue
-                
-            real_estate_last_date = df_re.index.max().date()
-            start_dt = min(base_dt, df_re.index.min())
-            end_dt = close_df.index.max() if not close_df.empty else pd.Timestamp.today().normalize()
-            daily_idx = pd.date_range(start=start_dt, end=end_dt, freq='D')
-            
-            series = df_re.iloc[:, 0].reindex(daily_idx)
-            series = series.interpolate(method='linear', limit_area='inside')
-            series = series.ffill().bfill()
-            series = series[series.index >= base_dt]
-        else:
-            if ticker not in close_df.columns: 
-                continue
-            series = close_df[ticker].dropna()
-            series = series[series.index >= base_dt]
-            
-        if series.empty: 
+        if ticker == "REAL_ESTATE" and not github_token:
+            st.error("⚠️ 깃허브 토큰이 없습니다.")
             continue
             
-        if period == "Weekly": 
-            series = series.resample('W').last().dropna()
-        elif period == "Monthly": 
-            series = series.resample('ME').last().dropna()
-        elif period == "Yearly": 
-            series = series.resample('YE').last().dropna()
-            
-        if series.empty: 
+        if ticker not in returns.columns:
+            continue
+        pct_change = returns[ticker].dropna()
+        if pct_change.empty: 
             continue
         
-        base_price = series.iloc[0]
-        end_price = series.iloc[-1]
-        pct_change = ((series - base_price) / base_price) * 100
+        end_price = panels.values[period].at[pct_change.index[-1], ticker]
         
-        valid_change = pct_change.dropna()
+        valid_change = pct_change
         if not valid_change.empty:
             global_min_y = min(global_min_y, valid_change.min())
             global_max_y = max(global_max_y, valid_change.max())
@@ -710,26 +1928,13 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
             if current_max_x > global_max_x_date:
                 global_max_x_date = current_max_x
         
-        if name == 'Seoul APT': 
-            cat = 'Real Estate'
-        elif name in ['Samsung', 'SK Hynix', 'KOSPI', 'TIGER 200', 'HLB', 'HL만도'] or '.KS' in ticker or '.KQ' in ticker or '^KS' in ticker: 
-            cat = 'K-Market'
-        elif name in ['BTC', 'ETH'] or '-USD' in ticker: 
-            cat = 'Crypto'
-        elif name in ['Gold', 'Silver', 'Copper', 'Dollar Index', 'USD/KRW', 'USO', 'BNO'] or '=F' in ticker: 
-            cat = 'Macro'
-        elif name in ['TSMC', '비츠로테크']: 
-            cat = 'Others'
-        elif name in ['NASDAQ', 'S&P 500', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'AMZN', 'GOOG', 'AVGO', 'TSLA', 'META', 'PLTR', 'SpaceX', 'LLY', 'BRK-B'] or '^GSPC' in ticker or '^IXIC' in ticker or (ticker.isalpha() and ticker.isupper()): 
-            cat = 'US Tech'
-        else: 
-            cat = 'Others'
+        cat = classifier.category(name, ticker) if classifier is not None else classify_asset(name, ticker)
 
         summary_data.append({
             'name': name, 
             'cat': cat, 
             'end_val': end_price, 
-            'change_rate': ((end_price / base_price) - 1) * 100
+            'change_rate': pct_change.iloc[-1]
         })
         
         base_color = CATEGORY_COLORS.get(cat, '#777777')
@@ -746,9 +1951,22 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
             line_color = hex_to_rgba(base_color, alpha)
             category_counts[cat] = category_counts.get(cat, 0) + 1
             
+        line = downsample_series(pct_change, max_points)
+        if client_rebase:
+            # 기준일 이전 구간까지 보내야 브라우저에서 더 과거로 옮길 수 있음
+            # 기준일 이후(처음 보이는 구간)와 이전(숨은 구간)을 따로 축약 -> 보이는 구간은 서버 모드와 같은 해상도,
+            # LTTB는 양 끝 점을 남기므로 기준점도 그대로 포함 (첫 화면 = 서버가 정한 기준값 0%)
+            full = panels.values[period][ticker].dropna()
+            base_at = pct_change.index[0]
+            prices = pd.concat([
+                downsample_series(full[full.index < base_at], max_points),
+                downsample_series(full[full.index >= base_at], max_points),
+            ])
+            line = (prices / full.at[base_at] - 1) * 100
+            client_prices[name] = prices
         fig.add_trace(go.Scatter(
-            x=pct_change.index, 
-            y=pct_change.values, 
+            x=line.index, 
+            y=line.values, 
             mode='lines', 
             name=name, 
             line=dict(width=line_width, color=line_color, dash=current_style)
@@ -766,44 +1984,49 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
     
     y_span = global_max_y - global_min_y if global_max_y != global_min_y else 10
 
-    # [V9.8 수술] 중력 스택 로직: 선 끝점에 밀착 후 겹칠 때만 회피
+    # [V9.9] 라벨 배치: 실제 차트 폭/높이(px) 기준, 겹침은 PAV 최소 간격 해로 한 번에 해소 (기존 중력 스택 대체)
     end_points.sort(key=lambda x: x['y'], reverse=True)
+    target_x_max = global_max_x_date
+    label_font = LABEL_FONT
+    fig_height = TREND_HEIGHT
+    gap_ratio = LABEL_FONT * LABEL_LINE_RATIO / (TREND_HEIGHT - TREND_MARGIN['t'] - TREND_MARGIN['b'])
     if end_points:
-        n_items = len(end_points)
+        plot_w = chart_width - TREND_MARGIN['l'] - TREND_MARGIN['r'] - TREND_AXIS_PX
+        plot_h = TREND_HEIGHT - TREND_MARGIN['t'] - TREND_MARGIN['b']
         
-        max_text_pixel_width = max([calculate_pixel_width(ep['name']) for ep in end_points]) if end_points else 85.0
-        required_pixels = 10.0 + max_text_pixel_width + 5.0 # 지시선 10px로 밀착
+        # 라벨이 많으면 세로로 모두 들어가도록 글자 크기 축소, 최소 크기로도 넘치면 차트 높이를 늘림
+        label_font = round(max(LABEL_MIN_FONT, min(LABEL_FONT, plot_h / len(end_points) / LABEL_LINE_RATIO)), 1)
+        line_px = label_font * LABEL_LINE_RATIO
+        plot_h = max(plot_h, int(len(end_points) * line_px / LABEL_FILL))
+        fig_height = plot_h + TREND_MARGIN['t'] + TREND_MARGIN['b']
         
-        assumed_plot_width = 800.0
-        date_span_days = max(1, (global_max_x_date - pd.to_datetime(base_dt)).days)
+        max_text_px = max(text_width(f" {ep['name']}", label_font) for ep in end_points)
+        required_px = LABEL_ARROW_PX + max_text_px + 5.0
         
-        added_days = date_span_days * (required_pixels / assumed_plot_width)
+        # 추가 일수 / (기간 + 추가 일수) = required_px / plot_w 가 되도록 X축 확장
+        date_span_days = max(1, (global_max_x_date - pd.to_datetime(base_dt)).days)
+        added_days = date_span_days * required_px / max(plot_w - required_px, 1.0)
         target_x_max = global_max_x_date + timedelta(days=added_days)
+        text_x_pos = global_max_x_date + timedelta(days=(date_span_days + added_days) * LABEL_ARROW_PX / plot_w)
         
-        arrow_days = date_span_days * (10.0 / assumed_plot_width) 
-        text_x_pos = global_max_x_date + timedelta(days=arrow_days)
-        
-        # 최소 수직 간격(Y축 스팬의 4%)
-        min_y_dist = y_span * 0.04  
-        
-        # 1차 배치: 모든 글자를 자신 선의 끝점(Y)에 고정
-        for ep in end_points:
-            ep['target_y'] = ep['y']
-            
-        # 2차 정렬: 내림차순 정렬 상태에서 겹치면 아래로 밀어내기
-        for i in range(1, n_items):
-            prev_y = end_points[i-1]['target_y']
-            curr_y = end_points[i]['target_y']
-            if prev_y - curr_y < min_y_dist:
-                end_points[i]['target_y'] = prev_y - min_y_dist
-                
-        # 하단 텍스트 잘림 방지 (밀려난 글씨가 Y축 바닥을 뚫는 경우 범위 확장)
-        min_target_y = min([ep['target_y'] for ep in end_points])
-        if min_target_y < global_min_y:
-            global_min_y = min_target_y - (y_span * 0.05)
+        # 최소 간격(px -> Y 단위)은 축 범위에 따라 바뀌므로, 라벨이 범위를 넓히면 다시 풀기
+        ys = np.array([ep['y'] for ep in end_points])
+        lo, hi = global_min_y, global_max_y
+        for _ in range(5):
+            gap = (hi - lo if hi != lo else y_span) * line_px / plot_h
+            pos = solve_label_positions(ys, gap)
+            new_lo, new_hi = min(global_min_y, pos.min() - gap / 2), max(global_max_y, pos.max() + gap / 2)
+            if (new_lo, new_hi) == (lo, hi):
+                break
+            lo, hi = new_lo, new_hi
+        global_min_y, global_max_y = lo, hi
+        gap_ratio = line_px / plot_h
+        for ep, p in zip(end_points, pos):
+            ep['target_y'] = p
 
         for ep in end_points:
             fig.add_annotation(
+                name=ep['name'], 
                 x=ep['x'], 
                 y=ep['y'], 
                 xref="x", 
@@ -817,7 +2040,7 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
                 ay=ep['target_y'],  
                 axref="x",     
                 ayref="y",     
-                font=dict(size=11, color=ep['color']),
+                font=dict(size=label_font, color=ep['color']),
                 xanchor="left", 
                 yanchor="middle"
             )
@@ -829,9 +2052,9 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
         plot_bgcolor='white', 
         paper_bgcolor='white', 
         hovermode="x unified", 
-        height=450, 
+        height=fig_height, 
         showlegend=False, 
-        margin=dict(l=20, r=20, t=100, b=20), 
+        margin=TREND_MARGIN, 
         xaxis=dict(
             range=[base_dt, target_x_max],
             showline=True, 
@@ -877,7 +2100,20 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
         yanchor="bottom"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    if client_rebase and client_prices:
+        fig.update_xaxes(rangeselector=dict(buttons=[
+            dict(count=1, label="1M", step="month", stepmode="backward"),
+            dict(count=6, label="6M", step="month", stepmode="backward"),
+            dict(count=1, label="YTD", step="year", stepmode="todate"),
+            dict(count=1, label="1Y", step="year", stepmode="backward"),
+            dict(count=3, label="3Y", step="year", stepmode="backward"),
+            dict(step="all", label="All")
+        ]))
+        components.html(trend_rebase_html(fig, client_prices, gap_ratio), height=fig_height + 10)
+        note = "" if max_points is None else " (축약된 점 기준 · 정확한 값은 'Full Resolution')"
+        st.caption(f"* 확대하거나 범위 버튼을 누르면 화면 왼쪽 끝 이후 첫 점이 기준(0%)이 됩니다{note}. 요약은 사이드바 기준일 기준.")
+    else:
+        st.plotly_chart(fig, use_container_width=True)
     
     if "Seoul APT" in targets:
         if real_estate_last_date and pd.Timestamp.today().date() > real_estate_last_date:
@@ -904,30 +2140,16 @@ def draw_trend_chart(targets, base_date, period, close_df, custom_mapping, githu
         tags = get_dynamic_hashtags([d['name'] for d in summary_data], ['#Investing', '#TrendAnalysis', '#HanMARI'])
         st.code("\n".join(sum_lines) + f"\n\n{tags}", language=None)
 
-def draw_deep_dive_chart(ticker_symbol, raw_df, ticker_name, plot_days):
+def draw_deep_dive_chart(ticker_symbol, indicators, ticker_name, plot_days, max_points=None, chart_width=DEFAULT_CHART_WIDTH):
     try:
-        if isinstance(raw_df.columns, pd.MultiIndex) and ticker_symbol in raw_df.columns.get_level_values(1):
-            df = raw_df.xs(ticker_symbol, axis=1, level=1).copy()
-        elif isinstance(raw_df.columns, pd.MultiIndex):
-            df = raw_df.xs(ticker_symbol, axis=1, level=0).copy()
-        else:
-            df = raw_df.copy()
-            
-        df = df.dropna(subset=['Close'])
+        df = indicators.frame(ticker_symbol)
         if df.empty: 
             return st.warning("No data found.")
             
-        df.index = pd.to_datetime(df.index).tz_localize(None)
-        df['SMA50'] = df['Close'].rolling(50).mean()
-        df['SMA120'] = df['Close'].rolling(120).mean()
-        df['SMA200'] = df['Close'].rolling(200).mean()
-        
-        delta = df['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = -delta.where(delta < 0, 0).rolling(14).mean()
-        df['RSI14'] = 100 - (100 / (1 + (gain / loss)))
-        
         plot_df = df.tail(plot_days)
+        bars = downsample_ohlcv(plot_df, max_points // CANDLE_MIN_PX if max_points else None)
+        sma = {w: downsample_series(plot_df[f'SMA{w}'], max_points) for w in (50, 120, 200)}
+        rsi = downsample_series(plot_df['RSI14'], max_points)
         
         fig = make_subplots(
             rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05, 
@@ -936,18 +2158,18 @@ def draw_deep_dive_chart(ticker_symbol, raw_df, ticker_name, plot_days):
         )
         
         fig.add_trace(go.Candlestick(
-            x=plot_df.index, open=plot_df['Open'], high=plot_df['High'], 
-            low=plot_df['Low'], close=plot_df['Close'], name='Price'
+            x=bars.index, open=bars['Open'], high=bars['High'], 
+            low=bars['Low'], close=bars['Close'], name='Price'
         ), row=1, col=1)
         
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['SMA50'], line=dict(color='blue', width=1.5), name='50 SMA'), row=1, col=1)
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['SMA120'], line=dict(color='orange', width=2), name='120 SMA'), row=1, col=1)
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['SMA200'], line=dict(color='red', width=1.5), name='200 SMA'), row=1, col=1)
+        fig.add_trace(go.Scatter(x=sma[50].index, y=sma[50].values, line=dict(color='blue', width=1.5), name='50 SMA'), row=1, col=1)
+        fig.add_trace(go.Scatter(x=sma[120].index, y=sma[120].values, line=dict(color='orange', width=2), name='120 SMA'), row=1, col=1)
+        fig.add_trace(go.Scatter(x=sma[200].index, y=sma[200].values, line=dict(color='red', width=1.5), name='200 SMA'), row=1, col=1)
         
-        colors = ['red' if r['Close'] < r['Open'] else 'green' for _, r in plot_df.iterrows()]
-        fig.add_trace(go.Bar(x=plot_df.index, y=plot_df['Volume'], marker_color=colors, name='Volume'), row=2, col=1)
+        colors = np.where(bars['Close'] < bars['Open'], 'red', 'green')
+        fig.add_trace(go.Bar(x=bars.index, y=bars['Volume'], marker_color=colors, name='Volume'), row=2, col=1)
         
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['RSI14'], line=dict(color='purple', width=1.5), name='RSI'), row=3, col=1)
+        fig.add_trace(go.Scatter(x=rsi.index, y=rsi.values, line=dict(color='purple', width=1.5), name='RSI'), row=3, col=1)
         fig.add_hline(y=70, line_dash="dash", line_color="red", row=3, col=1)
         fig.add_hline(y=30, line_dash="dash", line_color="green", row=3, col=1)
         
@@ -955,14 +2177,15 @@ def draw_deep_dive_chart(ticker_symbol, raw_df, ticker_name, plot_days):
         fig.update_yaxes(showline=False, mirror=False)
         fig.add_shape(type="rect", xref="paper", yref="paper", x0=0, y0=0, x1=1, y1=1, line=dict(color="#CCCCCC", width=1.5), layer="above")
 
-        assumed_plot_width = 800.0
-        padding_days = 0.5 + (plot_days * 5.0 / assumed_plot_width)
+        # 양 끝 캔들이 잘리지 않도록 약 5px 여백 (그리는 폭 = 선택한 차트 폭 - 좌우 여백 - Y축 눈금)
+        plot_width = max(1.0, chart_width - DEEP_DIVE_MARGIN['l'] - DEEP_DIVE_MARGIN['r'] - TREND_AXIS_PX)
+        padding_days = 0.5 + (plot_days * 5.0 / plot_width)
 
         fig.update_layout(
             title=None,
             font=dict(family="Malgun Gothic, Arial"),
             height=750, 
-            margin=dict(l=20, r=20, t=100, b=20),
+            margin=DEEP_DIVE_MARGIN,
             xaxis=dict(range=[plot_df.index[0] - timedelta(days=padding_days), plot_df.index[-1] + timedelta(days=padding_days)]),
             showlegend=True,
             legend=dict(
@@ -987,6 +2210,8 @@ def draw_deep_dive_chart(ticker_symbol, raw_df, ticker_name, plot_days):
         )
         
         st.plotly_chart(fig, use_container_width=True)
+        if len(bars) < len(plot_df):
+            st.caption(f"* {len(plot_df)}봉 -> {len(bars)}봉으로 묶어 표시 ({-(-len(plot_df) // len(bars))}일 단위) · 'Full Resolution'을 켜면 원본 일봉으로 확대 가능")
         st.download_button(
             f"📥 Download {ticker_name} Raw Data", 
             data=df.to_csv().encode('utf-8'), 
@@ -997,48 +2222,215 @@ def draw_deep_dive_chart(ticker_symbol, raw_df, ticker_name, plot_days):
     except Exception as e: 
         st.error(f"Error: {e}")
 
+# [V9.9] Market Overview 패널 단위 작업: UI(main)와 헤드리스 배치(hanmari_batch)가 같은 경로로 차트·텍스트 생성
+GLOBAL_TARGETS = ['Gold','NVDA','Silver','AAPL','MSFT','AMZN','GOOG','TSMC','AVGO','TSLA','META','BTC','SpaceX','LLY','BRK-B','Samsung']
+KEY_TARGETS = ['Gold','Silver','Copper','BTC','ETH','KOSPI','NASDAQ','S&P 500','Dollar Index','USD/KRW']
+
+def build_name_map(ports):
+    # TICKERS + 포트폴리오 슬롯 -> {표시이름: 티커} ("티커=이름"이면 같은 티커의 기존 이름을 대체)
+    name_map = TICKERS.copy()
+    for p in ports.values():
+        for item in p['tickers'].split(','):
+            item = item.strip()
+            if not item: 
+                continue
+                
+            if '=' in item:
+                t, n = [x.strip() for x in item.rsplit('=', 1)]
+                keys_to_remove = [k for k, v in name_map.items() if v == t]
+                for k in keys_to_remove: 
+                    del name_map[k]
+                name_map[n] = t
+            else:
+                if item not in name_map: 
+                    name_map[item] = item
+    return name_map
+
+def slot_names(p_data):
+    names = []
+    for n in p_data['tickers'].split(','):
+        if not n.strip(): continue
+        names.append(n.split('=')[1].strip() if '=' in n else n.strip())
+    return names
+
+# 백그라운드 갱신이 끝나면 앱 전체를 다시 실행 -> 같은 자리의 차트가 최신 데이터로 교체됨
+@st.fragment(run_every=PROGRESSIVE_POLL_SECONDS)
+def refresh_watcher(tickers, generation):
+    # 시계가 아니라 작업 세대로 비교 -> 화면을 그리기 전에 끝난 작업도 놓치지 않음
+    state = get_refresh_state()
+    with state['lock']:
+        entry = state['fresh'].get(tickers)
+    if entry is not None and entry[2] >= generation:
+        st.rerun(scope="app")
+    st.caption("⏳ 저장된 데이터로 먼저 표시 중 (stale) · 최신 시세 수신 중...")
+
+def show_overview_panel(out):
+    png, text = out
+    st.image(png, use_container_width=True)
+    st.code(text, language=None)
+
+# [V9.9] 패널 병렬 렌더링: matplotlib은 CPU 작업 + GIL 점유 -> spawn 프로세스 풀에서 동시에 그리고, 끝나는 순서대로 자리에 채움
+RENDER_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+@st.cache_resource
+def get_render_pool():
+    return ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+def render_overview_parallel(jobs, status, period, snapshot, name_map, data_token, clock_key, universe, kst_now):
+    import hanmari_batch  # 워커 함수는 배치 모듈에 있음 (모듈 로드 시 순환 import 방지)
+    tickers = universe_key(name_map)
+    state_key = hanmari_batch.worker_key(data_token, clock_key, tickers, universe, name_map)
+    slots = [st.empty() for _ in jobs]
+    done = set()
+    pool = None
+    try:
+        pool = get_render_pool()
+        futures = {
+            pool.submit(hanmari_batch.render_panel_task, state_key, tickers, universe, name_map, kst_now, job, status, period): i
+            for i, job in enumerate(jobs)
+        }
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                out = fut.result()[3]
+            except hanmari_batch.DataMismatch:
+                # 워커의 저장소 패널이 화면의 패널과 다름 -> 이 패널은 앱의 스냅샷으로 직접 렌더링
+                out = render_overview_panel(jobs[i], status, period, snapshot, name_map)
+            done.add(i)
+            if out is not None:
+                with slots[i].container():
+                    show_overview_panel(out)
+    except Exception as e:
+        # 풀이 깨졌으면 버리고 남은 패널은 스크립트 스레드에서 순차 처리
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        get_render_pool.clear()
+        st.warning(f"⚠️ 병렬 렌더링 실패, 순차 처리로 전환합니다: {e}")
+        for i, job in enumerate(jobs):
+            if i in done: 
+                continue
+            out = render_overview_panel(job, status, period, snapshot, name_map)
+            if out is not None:
+                with slots[i].container():
+                    show_overview_panel(out)
+
+def overview_jobs(show_global, show_key, active_slots):
+    # (패널 키, 제목, 대상 이름들) -- 패널끼리는 서로 독립
+    jobs = []
+    if show_global:
+        jobs.append(('global', "Global Top 12+1", GLOBAL_TARGETS))
+    if show_key:
+        jobs.append(('key', "Key Indicators", KEY_TARGETS))
+    for k, p_data in active_slots.items():
+        jobs.append((k, p_data['name'], slot_names(p_data)))
+    return jobs
+
+def render_overview_panel(job, status, period, snapshot, name_map):
+    # -> (PNG 바이트, 트위터 텍스트) / 데이터 없으면 None
+    key, title, names = job
+    mapping = None if key in ('global', 'key') else name_map
+    df = process_data(names, period, status, None, None, None, mapping, snapshot=snapshot)
+    if df.empty: 
+        return None
+    # 차트 부제에는 분(HH:MM)을 넣지 않음 -> 같은 데이터면 분이 바뀌어도 PNG 캐시 적중 (시각은 트위터 텍스트에만)
+    if key == 'global':
+        df, t_name = format_top13_df(df, title)
+        png = top13_chart_png(df, f"{t_name} {period}", get_subtitle(status, df, with_time=False), is_ath=(status=='ATH'))
+        return png, generate_twitter_text(df, t_name, get_subtitle(status, df), True)
+    df = sort_by_category(df)
+    png = normal_chart_png(df, f"{title} {period}", get_subtitle(status, df, with_time=False))
+    return png, generate_twitter_text(df, title, get_subtitle(status, df))
+
+# [V9.9] 사전 예열 스케줄러: 시장별 마감(암호화폐는 UTC 일봉 교체) + 지연 직후 저장소 보충 -> 파생 스냅샷까지 미리 생성
+# 경계 시각 직후 첫 사용자가 전체 다운로드 비용을 내지 않도록 프로세스당 데몬 스레드 1개
+PREWARM_DELAY_SECONDS = 300     # 마감 직후 야후에 최종 봉이 반영될 시간
+PREWARM_MAX_SLEEP = 900         # 달력 밖 상황(휴장 연속 등) 대비 주기적 재확인
+
+def next_prewarm_time(state, now):
+    day = now.date()
+    if state['calendar_day'] != day:
+        state['calendars'] = {m: SessionCalendar(m) for m in MARKET_SESSIONS}
+        state['calendar_day'] = day
+    delay = pd.Timedelta(seconds=PREWARM_DELAY_SECONDS)
+    closes = [c.next_close(now - delay) for c in state['calendars'].values()]
+    closes = [(c + delay) for c in closes if c is not None]
+    return min(closes) if closes else now + pd.Timedelta(seconds=PREWARM_MAX_SLEEP)
+
+def prewarm_market_data():
+    # main()과 같은 키로 패널·가격 색인·스냅샷 캐시를 채움
+    name_map = build_name_map(load_portfolios())
+    tickers = universe_key(name_map)
+    load_universe_panel.clear(tickers)
+    panel = load_universe_panel(tickers)
+    state = get_refresh_state()
+    with state['lock']:
+        state['fresh'][tickers] = (panel, time.time(), next_refresh_generation(state))
+    
+    close_df, high_df, open_df = panel.close, panel.high, panel.open
+    data_token = frame_token(close_df, high_df, open_df)
+    kst_now = get_korea_time()
+    price_index = get_price_index(data_token, close_df, high_df, open_df)
+    universe = tuple(TICKERS.items()) + tuple(name_map.items())
+    get_market_snapshot(data_token, snapshot_clock_key(kst_now, price_index), universe, price_index, kst_now)
+    get_indicator_panel(data_token, panel)
+
+def prewarm_loop(state):
+    while True:
+        now = pd.Timestamp.now(tz='UTC')
+        due = next_prewarm_time(state, now)
+        state['next_run'] = due
+        time.sleep(max(1.0, min((due - now).total_seconds(), PREWARM_MAX_SLEEP)))
+        if pd.Timestamp.now(tz='UTC') < due: 
+            continue
+        try:
+            prewarm_market_data()
+            state['last_run'], state['last_error'] = pd.Timestamp.now(tz='UTC'), None
+        except Exception as e:
+            state['last_error'] = str(e)
+
+@st.cache_resource
+def start_prewarm_scheduler():
+    state = {'calendars': {}, 'calendar_day': None, 'next_run': None, 'last_run': None, 'last_error': None}
+    threading.Thread(target=prewarm_loop, args=(state,), daemon=True, name="hanmari-prewarm").start()
+    return state
+
 # ==========================================
 # 5. Main App & Sidebar
 # ==========================================
 def main():
     st.set_page_config(page_title="HanMARI V9.8", layout="wide")
+    prewarm = start_prewarm_scheduler()
     ports = load_portfolios()
     
     with st.sidebar:
         if st.button("🔄 Refresh Data", type="primary"): 
             st.cache_data.clear()
+            load_universe_panel.clear()
+            with get_refresh_state()['lock']:
+                get_refresh_state()['fresh'].clear()
             st.rerun()
             
+        progressive = st.checkbox("⚡ Progressive Load", value=False, help="저장된 데이터로 즉시 표시하고 최신 시세는 백그라운드에서 받아 교체합니다.")
+            
         mode = st.radio("View Mode", ["Market Overview", "Trend Analysis", "Deep Dive (Interactive)"])
         st.markdown("---")
         
-        all_deep_dive_map = TICKERS.copy()
-        for p in ports.values():
-            for item in p['tickers'].split(','):
-                item = item.strip()
-                if not item: 
-                    continue
-                    
-                if '=' in item:
-                    t, n = [x.strip() for x in item.rsplit('=', 1)]
-                    keys_to_remove = [k for k, v in all_deep_dive_map.items() if v == t]
-                    for k in keys_to_remove: 
-                        del all_deep_dive_map[k]
-                    all_deep_dive_map[n] = t
-                else:
-                    if item not in all_deep_dive_map: 
-                        all_deep_dive_map[item] = item
+        all_deep_dive_map = build_name_map(ports)
+        
+        universe = tuple(TICKERS.items()) + tuple(all_deep_dive_map.items())
+        classifier = get_classifier(universe)
                 
         if mode == "Market Overview":
-            status = st.radio("Status", ('Live', 'Completed', 'Cycle', 'ATH'))
+            status = st.radio("Status", OVERVIEW_STATUSES)
             
             if status == 'ATH':
-                period = 'All'
+                period = ATH_PERIOD
             else:
-                period = st.selectbox("Period", ('Daily', 'Weekly', 'Monthly', 'Yearly'))
+                period = st.selectbox("Period", OVERVIEW_PERIODS)
                 
             show_global = st.checkbox("Global Top 12+1", value=True)
             show_key = st.checkbox("Key Indicators", value=False)
+            parallel_render = st.checkbox("⚡ Parallel Render", value=False)
             
             active_slots = {}
             for k in ports.keys():
@@ -1050,27 +2442,7 @@ def main():
             trend_period = st.selectbox("2) 주기", ["Daily", "Weekly", "Monthly", "Yearly"])
             trend_targets = []
             
-            cat_groups = {
-                'Real Estate': [], 'US Tech': [], 'K-Market': [], 
-                'Crypto': [], 'Macro': [], 'Others': []
-            }
-            
-            for name, ticker in all_deep_dive_map.items():
-                if name == 'Seoul APT':
-                    cat = 'Real Estate'
-                elif name in ['Samsung', 'SK Hynix', 'KOSPI', 'TIGER 200', 'HLB', 'HL만도'] or '.KS' in ticker or '.KQ' in ticker or '^KS' in ticker:
-                    cat = 'K-Market'
-                elif name in ['BTC', 'ETH'] or '-USD' in ticker:
-                    cat = 'Crypto'
-                elif name in ['Gold', 'Silver', 'Copper', 'Dollar Index', 'USD/KRW', 'USO', 'BNO'] or '=F' in ticker:
-                    cat = 'Macro'
-                elif name in ['TSMC', '비츠로테크']:
-                    cat = 'Others'
-                elif name in ['NASDAQ', 'S&P 500', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'AMZN', 'GOOG', 'AVGO', 'TSLA', 'META', 'PLTR', 'SpaceX', 'LLY', 'BRK-B'] or '^GSPC' in ticker or '^IXIC' in ticker or (ticker.isalpha() and ticker.isupper()):
-                    cat = 'US Tech'
-                else:
-                    cat = 'Others'
-                cat_groups[cat].append(name)
+            cat_groups = classifier.groups(all_deep_dive_map)
                 
             for cat, items in cat_groups.items():
                 if items:
@@ -1081,6 +2453,8 @@ def main():
                             if cols[i%2].checkbox(item, value=is_checked): 
                                 trend_targets.append(item)
                                 
+            client_rebase = st.checkbox("🖱️ Client-side Rebase", value=False, help="가격을 한 번만 보내고, 확대/범위 선택 시 브라우저에서 기준일을 다시 잡습니다 (서버 재실행 없음).")
+                                
         else:
             valid_targets = {k:v for k,v in all_deep_dive_map.items() if v != 'REAL_ESTATE'}
             deep_dive_target = st.selectbox("Select Asset", options=list(valid_targets.keys()))
@@ -1089,6 +2463,12 @@ def main():
             tf_days = {"3 Months": 63, "6 Months": 126, "1 Year": 252, "3 Years": 756, "Max (10Y)": 2520}
             plot_days = tf_days[st.selectbox("Timeframe", tf_options, index=2)]
 
+        if mode != "Market Overview":
+            chart_width = st.select_slider("Chart Width (px)", options=CHART_WIDTH_OPTIONS, value=DEFAULT_CHART_WIDTH,
+                                           help="화면 폭만큼만 점을 보내 차트를 가볍게 합니다.")
+            full_res = st.checkbox("🔍 Full Resolution", value=False, help="확대/호버용으로 원본 데이터를 모두 보냅니다.")
+            max_points = None if full_res else chart_width
+
         st.markdown("---")
         with st.expander("🛠️ 포트폴리오 편집 (4개 슬롯)"):
             new_ports = {}
@@ -1102,6 +2482,27 @@ def main():
                 save_portfolios(new_ports)
                 st.success("저장 완료! 상단의 🔄 Refresh Data 버튼을 눌러주세요.")
 
+        with st.expander("📡 Fetch Stats"):
+            stats_df = fetch_stats_df()
+            if stats_df.empty:
+                st.caption("아직 수집 기록이 없습니다.")
+            else:
+                st.dataframe(stats_df, hide_index=True, use_container_width=True)
+                st.caption(f"* shard = 묶음 호출 1회 시간, symbol = 단일 종목 호출 시간 · {FETCH_SLOW_SECONDS:g}초 넘은 묶음의 종목은 다음 수집 때 개별 측정")
+            if prewarm['next_run'] is not None:
+                kst = pytz.timezone('Asia/Seoul')
+                last = prewarm['last_run'].tz_convert(kst).strftime('%m/%d %H:%M') if prewarm['last_run'] is not None else '-'
+                st.caption(f"🔥 Pre-warm: next {prewarm['next_run'].tz_convert(kst).strftime('%m/%d %H:%M')} KST · last {last}")
+                if prewarm['last_error']:
+                    st.caption(f"⚠️ {prewarm['last_error']}")
+            http_df = get_http_client().stats_df()
+            if not http_df.empty:
+                st.dataframe(http_df, hide_index=True, use_container_width=True)
+            chart_cache = get_chart_cache()
+            lookups = chart_cache['hits'] + chart_cache['misses']
+            if lookups:
+                st.caption(f"🖼️ Chart cache: {chart_cache['hits']}/{lookups} hits ({chart_cache['hits'] / lookups:.0%}) · {len(chart_cache['items'])}/{CHART_CACHE_SIZE} PNG")
+
         st.markdown("---")
         github_token = st.text_input("GitHub Token", type="password")
         
@@ -1115,11 +2516,18 @@ def main():
                     new_d = st.date_input("Date", value=df_re.index.max().date() + timedelta(days=7))
                     new_v = st.number_input("Value", value=float(df_re.iloc[-1,0]))
                     
-                    if st.button("Push to GitHub"):
-                        if update_github_real_estate(github_token, new_d, new_v): 
-                            st.success("Updated!")
-                            st.cache_data.clear()
-                            st.rerun()
+                    if st.button("Stage"):
+                        stage_real_estate_update(github_token, new_d, new_v)
+                        st.rerun()
+                    
+                    pending = pending_real_estate_updates(github_token)
+                    if pending:
+                        # 스테이징 값은 차트에 반영되지 않음 (푸시 후 게시본으로 표시)
+                        st.caption(f"📝 미게시 {len(pending)}건 (차트 미반영): " + ", ".join(f"{d} = {v:g}" for d, v in sorted(pending.items())))
+                        if st.button(f"Push to GitHub ({len(pending)})"):
+                            if push_real_estate_updates(github_token): 
+                                st.success("Updated!")
+                                st.rerun()
         else: 
             st.info("💡 토큰을 입력하면 업데이트 창이 활성화됩니다.")
             
@@ -1131,62 +2539,51 @@ def main():
 
     st.markdown("<h3>📊 HanMARI V9.8</h3>", unsafe_allow_html=True)
     
-    if st.button('🚀 Run Analysis', use_container_width=True):
-        close_df, high_df, open_df, raw_df = download_all_data()
-        
-        extra_tickers = tuple(set(all_deep_dive_map.values()) - set(TICKERS.values()) - {'REAL_ESTATE'})
-        e_close, e_high, e_open, e_raw = download_extra_data(extra_tickers)
-        
-        if not e_close.empty: 
-            close_df = pd.concat([close_df, e_close], axis=1)
-            high_df = pd.concat([high_df, e_high], axis=1)
-            open_df = pd.concat([open_df, e_open], axis=1)
-            raw_df = pd.concat([raw_df, e_raw], axis=1)
+    run_clicked = st.button('🚀 Run Analysis', use_container_width=True)
+    if run_clicked or progressive:
+        tickers = universe_key(all_deep_dive_map)
+        if progressive:
+            panel, stale, pending = progressive_panel(tickers)
+            if stale and pending is not None:
+                refresh_watcher(tickers, pending)
+            elif stale:
+                st.caption("⚠️ 최신 시세 갱신 실패 · 저장된 데이터로 표시 중 (stale)")
+            if panel.is_empty():
+                st.info("⏳ 저장된 데이터가 없습니다. 첫 수신이 끝나면 자동으로 표시됩니다.")
+                return
+        else:
+            panel = load_universe_panel(tickers)
+        close_df, high_df, open_df = panel.close, panel.high, panel.open
             
         if mode == "Deep Dive (Interactive)": 
-            draw_deep_dive_chart(all_deep_dive_map[deep_dive_target], raw_df, deep_dive_target, plot_days)
+            indicators = get_indicator_panel(frame_token(close_df, high_df, open_df), panel)
+            draw_deep_dive_chart(all_deep_dive_map[deep_dive_target], indicators, deep_dive_target, plot_days, max_points, chart_width)
             
         elif mode == "Trend Analysis": 
-            draw_trend_chart(trend_targets, trend_base_date, trend_period, close_df, all_deep_dive_map, github_token)
+            draw_trend_chart(trend_targets, trend_base_date, trend_period, close_df, all_deep_dive_map, github_token, classifier, max_points, chart_width, client_rebase)
             
         else:
-            if show_global:
-                g_targets = ['Gold','NVDA','Silver','AAPL','MSFT','AMZN','GOOG','TSMC','AVGO','TSLA','META','BTC','SpaceX','LLY','BRK-B','Samsung']
-                df_g = process_data(g_targets, period, status, close_df, high_df, open_df)
-                if not df_g.empty: 
-                    df_g, t_name = format_top13_df(df_g, "Global Top 12+1")
-                    sub_t = get_subtitle(status, df_g)
-                    draw_top13_chart(df_g, f"{t_name} {period}", sub_t, is_ath=(status=='ATH'))
-                    st.code(generate_twitter_text(df_g, t_name, sub_t, True), language=None)
-                    
-            if show_key:
-                k_targets = ['Gold','Silver','Copper','BTC','ETH','KOSPI','NASDAQ','S&P 500','Dollar Index','USD/KRW']
-                df_k = process_data(k_targets, period, status, close_df, high_df, open_df)
-                if not df_k.empty: 
-                    df_k = sort_by_category(df_k)
-                    sub_t = get_subtitle(status, df_k)
-                    draw_normal_chart(df_k, f"Key Indicators {period}", sub_t)
-                    st.code(generate_twitter_text(df_k, "Key Indicators", sub_t), language=None)
-                    
-            for p_data in active_slots.values():
-                names = []
-                for n in p_data['tickers'].split(','):
-                    if not n.strip(): continue
-                    names.append(n.split('=')[1].strip() if '=' in n else n.strip())
-                    
-                df_c = process_data(names, period, status, close_df, high_df, open_df, all_deep_dive_map)
-                if not df_c.empty: 
-                    df_c = sort_by_category(df_c)
-                    sub_t = get_subtitle(status, df_c)
-                    draw_normal_chart(df_c, f"{p_data['name']} {period}", sub_t)
-                    st.code(generate_twitter_text(df_c, p_data['name'], sub_t), language=None)
-
-def get_subtitle(status, df):
+            data_token = frame_token(close_df, high_df, open_df)
+            kst_now = get_korea_time()
+            price_index = get_price_index(data_token, close_df, high_df, open_df)
+            clock_key = snapshot_clock_key(kst_now, price_index)
+            snapshot = get_market_snapshot(data_token, clock_key, universe, price_index, kst_now)
+            jobs = overview_jobs(show_global, show_key, active_slots)
+            if parallel_render and len(jobs) > 1:
+                render_overview_parallel(jobs, status, period, snapshot, all_deep_dive_map, data_token, clock_key, universe, kst_now)
+            else:
+                for job in jobs:
+                    out = render_overview_panel(job, status, period, snapshot, all_deep_dive_map)
+                    if out is not None: 
+                        show_overview_panel(out)
+
+def get_subtitle(status, df, with_time=True):
     if status == 'ATH': 
         return "All-Time High"
     kst = get_korea_time()
     max_base = df['base_date'].max()
-    return f"{kst.month}/{kst.day} {kst.strftime('%H:%M')} KST vs {max_base.month}/{max_base.day}"
+    clock = f" {kst.strftime('%H:%M')}" if with_time else ""
+    return f"{kst.month}/{kst.day}{clock} KST vs {max_base.month}/{max_base.day}"
 
 if __name__ == '__main__': 
     main()
\ No newline at end of file
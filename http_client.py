@@ -0,0 +1,82 @@
+import time
+import threading
+import requests
+import pandas as pd
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==========================================
+# 공용 HTTP 클라이언트 (GitHub / 폰트 다운로드 공용)
+# ==========================================
+# 호출마다 새 연결(TLS 핸드셰이크)을 맺던 requests.get/put 대신 keep-alive 세션 풀을 공유하고,
+# 모든 요청에 기본 타임아웃을 걸어 응답 없는 서버가 스크립트 스레드를 붙잡지 못하게 한다.
+DEFAULT_TIMEOUT = (3.05, 15)    # (연결, 읽기) 초
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5             # 0.5s, 1s, 2s ...
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_SIZE = 8
+
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=RETRY_TOTAL, backoff=RETRY_BACKOFF, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        # 재시도는 멱등 요청(GET/HEAD)만: PUT은 중복 커밋 위험이 있어 호출 측에서 판단
+        retry = Retry(
+            total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        status = None
+        try:
+            res = self.session.request(method, url, **kwargs)
+            status = res.status_code
+            return res
+        finally:
+            self.record(method, url, status, time.perf_counter() - start)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def record(self, method, url, status, elapsed):
+        key = (method, urlsplit(url).netloc)
+        with self.lock:
+            s = self.stats.setdefault(key, {'calls': 0, 'errors': 0, 'total_s': 0.0, 'max_s': 0.0, 'last_status': None})
+            s['calls'] += 1
+            s['errors'] += int(status is None or status >= 400)
+            s['total_s'] += elapsed
+            s['max_s'] = max(s['max_s'], elapsed)
+            s['last_status'] = status
+
+    def stats_df(self):
+        with self.lock:
+            rows = [
+                {'Method': m, 'Host': host, 'Calls': s['calls'], 'Errors': s['errors'],
+                 'Avg (ms)': round(s['total_s'] / s['calls'] * 1000, 1),
+                 'Max (ms)': round(s['max_s'] * 1000, 1), 'Last Status': s['last_status']}
+                for (m, host), s in self.stats.items()
+            ]
+        return pd.DataFrame(rows)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    # 프로세스 공용 인스턴스 (모듈은 Streamlit 재실행 사이에도 유지됨)
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,121 @@
+import io
+import os
+import csv
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 주간 지수 시계열 저장소 (강남 11구 아파트 지수 등 지역 지수 공용)
+# ==========================================
+# 정렬·중복 제거된 int32 날짜(1970-01-01 기준 일수) + float64 값 두 배열로 보관한다.
+# 콤마·공백·깨진 행 정제와 날짜 해석은 데이터를 쓸 때(ingest) 한 번만 하고, 조회/갱신은 이진 탐색.
+# (값은 원본 CSV가 15자리까지 기록되어 있어 float32로 줄이면 푸시할 때 과거 값이 바뀜 -> float64 유지)
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+def to_day(date):
+    # 날짜(문자열/date/Timestamp) -> int32 일수, 해석 불가면 ValueError
+    ts = pd.to_datetime(date, errors='coerce')
+    if pd.isna(ts):
+        raise ValueError(f"날짜 형식 오류: {date!r}")
+    return np.int32((np.datetime64(ts.normalize(), 'D') - EPOCH).astype(np.int64))
+
+class IndexSeries:
+    def __init__(self, dates=None, values=None):
+        self.dates = np.asarray([] if dates is None else dates, dtype=np.int32)
+        self.values = np.asarray([] if values is None else values, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_columns(cls, dates, values):
+        # 검증 ingest: 날짜·숫자로 해석되지 않거나 유한하지 않은 행은 버리고, 같은 날짜는 뒤쪽 값 우선
+        d = pd.to_datetime(pd.Series(dates), errors='coerce')
+        v = pd.Series(values)
+        if not pd.api.types.is_numeric_dtype(v):
+            v = v.astype(str).str.replace(',', '', regex=False).str.strip()
+        v = pd.to_numeric(v, errors='coerce')
+        ok = (d.notna() & v.notna()).to_numpy() & np.isfinite(v.to_numpy(dtype=np.float64))
+
+        days = (d[ok].to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int32)
+        vals = v[ok].to_numpy(dtype=np.float64)
+        order = np.argsort(days, kind='stable')
+        days, vals = days[order], vals[order]
+        last = np.r_[days[1:] != days[:-1], True]
+        return cls(days[last], vals[last])
+
+    @classmethod
+    def from_csv(cls, content):
+        # 양식 파괴 대비: 제목행 내용과 무관하게 첫 열 = 날짜, 둘째 열 = 값
+        df = pd.read_csv(io.StringIO(content), header=0, dtype=str)
+        if len(df.columns) < 2:
+            raise ValueError("날짜/값 두 열이 필요합니다.")
+        series = cls.from_columns(df.iloc[:, 0], df.iloc[:, 1])
+        if not len(series):
+            raise ValueError("유효한 행이 없습니다.")
+        return series
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['dates'], data['values'])
+
+    def save(self, path):
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, dates=self.dates, values=self.values)
+        os.replace(path + ".tmp", path)
+
+    def copy(self):
+        return IndexSeries(self.dates.copy(), self.values.copy())
+
+    def upsert(self, date, value):
+        # 같은 날짜가 있으면 덮어쓰기, 없으면 정렬 위치에 끼워 넣기 (위치 탐색 O(log n))
+        day, value = to_day(date), float(value)
+        if not np.isfinite(value):
+            raise ValueError(f"값 오류: {value!r}")
+        i = int(np.searchsorted(self.dates, day))
+        if i < len(self.dates) and self.dates[i] == day:
+            self.values[i] = value
+        else:
+            self.dates = np.insert(self.dates, i, day)
+            self.values = np.insert(self.values, i, value)
+
+    def index(self):
+        return pd.DatetimeIndex((EPOCH + self.dates).astype('datetime64[ns]'), name='Date')
+
+    def to_frame(self):
+        return pd.DataFrame({'Value': self.values}, index=self.index())
+
+def splice_csv(content, edits):
+    # 원문 CSV에 수정분만 반영: 바뀌지 않은 행(해석 불가 행 포함)은 BOM·줄바꿈·공백까지 원문 그대로
+    # edits = {'YYYY-MM-DD': 값} -> 있는 날짜는 마지막 행(= ingest가 쓰는 행)의 값만 교체, 없는 날짜는 날짜 순 위치에 삽입
+    lines = content.splitlines(keepends=True)
+    if not lines:
+        raise ValueError("원문 CSV가 비어 있습니다.")
+    newline = '\r\n' if lines[0].endswith('\r\n') else '\n'
+    if not lines[-1].endswith(('\r', '\n')):
+        lines[-1] += newline
+    rows = [next(csv.reader([line]), []) for line in lines[1:]]
+    days = pd.to_datetime(pd.Series([r[0] if r else '' for r in rows]), errors='coerce')
+    days = np.where(days.notna(), days.to_numpy().astype('datetime64[D]') - EPOCH, -1 << 40).astype(np.int64)
+
+    def row_text(fields, value):
+        out = io.StringIO()
+        csv.writer(out, lineterminator=newline).writerow([fields[0], repr(float(value))] + fields[2:])
+        return out.getvalue()
+
+    inserts = {}
+    for date, value in edits.items():
+        day = int(to_day(date))
+        hit = np.flatnonzero(days == day)
+        if len(hit):
+            i = int(hit[-1])
+            lines[i + 1] = row_text(rows[i], value)
+        else:
+            # 이 날짜보다 이른 마지막 행 바로 뒤 (없으면 제목행 뒤)
+            earlier = np.flatnonzero((days < day) & (days >= 0))
+            at = int(earlier[-1]) + 2 if len(earlier) else 1
+            inserts.setdefault(at, []).append((day, row_text([str(date)], value)))
+    for at in sorted(inserts, reverse=True):
+        lines[at:at] = [text for _, text in sorted(inserts[at])]
+    return "".join(lines)
@@ -0,0 +1,61 @@
+from functools import lru_cache
+import numpy as np
+
+# ==========================================
+# 선 끝 라벨 배치 (Trend Analysis 공용)
+# ==========================================
+# 글자 폭은 폰트 메트릭 표(1000 units/em)에서 바로 읽고, 겹침 해소는 탐욕적 밀어내기 대신
+# "목표 위치와의 제곱 오차 최소 + 최소 간격" 문제를 PAV(isotonic regression)로 한 번에 푼다.
+
+# Arial Bold(= Helvetica-Bold 메트릭 호환) ASCII 0x20 ~ 0x7E 폭
+_LATIN_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,   # ' ' ~ '/'
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,   # '0' ~ '?'
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,   # '@' ~ 'O'
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,   # 'P' ~ '_'
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,   # '`' ~ 'o'
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,        # 'p' ~ '~'
+)
+HANGUL_WIDTH = 1000     # 맑은 고딕 한글 음절·자모는 전각
+DEFAULT_WIDTH = 556     # 표에 없는 글자 (평균 라틴 폭)
+
+def _build_table():
+    table = np.full(0x10000, DEFAULT_WIDTH, dtype=np.uint16)
+    table[0x20:0x7F] = _LATIN_BOLD
+    for lo, hi in ((0xAC00, 0xD7A3), (0x1100, 0x11FF), (0x3130, 0x318F), (0x4E00, 0x9FFF), (0xFF01, 0xFF60)):
+        table[lo:hi + 1] = HANGUL_WIDTH
+    return table
+
+GLYPH_WIDTHS = _build_table()
+
+@lru_cache(maxsize=1024)
+def text_width(text, font_size=11):
+    # 렌더링 폭(px) = 글자 폭 합(units) / 1000 * 글자 크기(px)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    units = GLYPH_WIDTHS[np.minimum(codes, 0xFFFF)].sum(dtype=np.int64)
+    return float(units) * font_size / 1000.0
+
+def isotonic_fit(values):
+    # PAV: 비감소 수열 중 values와의 제곱 오차가 최소인 것 (블록 평균 병합, O(n))
+    means, weights, sizes = [], [], []
+    for v in values:
+        means.append(float(v)); weights.append(1.0); sizes.append(1)
+        while len(means) > 1 and means[-2] > means[-1]:
+            w = weights[-2] + weights[-1]
+            means[-2] = (means[-2] * weights[-2] + means[-1] * weights[-1]) / w
+            weights[-2] = w
+            sizes[-2] += sizes[-1]
+            means.pop(); weights.pop(); sizes.pop()
+    return np.repeat(means, sizes)
+
+def solve_label_positions(targets, min_gap):
+    # 각 라벨을 목표 y에 최대한 가깝게 두되 이웃 간격 >= min_gap (순서는 목표 y 순서 유지)
+    # p_i = z_i + i*gap 치환 -> z 는 비감소 -> (targets - i*gap)의 isotonic 회귀
+    targets = np.asarray(targets, dtype=np.float64)
+    if len(targets) < 2 or min_gap <= 0:
+        return targets.copy()
+    order = np.argsort(targets, kind='stable')
+    offset = np.arange(len(targets)) * min_gap
+    out = np.empty_like(targets)
+    out[order] = isotonic_fit(targets[order] - offset) + offset
+    return out
@@ -7,10 +7,10 @@ import matplotlib.font_manager as fm
 import matplotlib.ticker as mticker
 import os
 import platform
-import requests
 from datetime import datetime, timedelta
 import pytz
 import numpy as np
+from http_client import get_client
 
 # ==========================================
 # 0. 폰트 설정 (불변)
@@ -27,7 +27,8 @@ def font_setting():
         if not os.path.exists(font_path):
             url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
             try:
-                response = requests.get(url)
+                response = get_client().get(url, timeout=(3.05, 60))
+                response.raise_for_status()
                 with open(font_path, "wb") as f:
                     f.write(response.content)
             except: pass
@@ -1,5 +1,4 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
@@ -7,10 +6,11 @@ import matplotlib.font_manager as fm
 import matplotlib.ticker as mticker
 import os
 import platform
-import requests
 from datetime import datetime, timedelta
 import pytz
 import numpy as np
+from price_history import BatchHistory
+from http_client import get_client
 
 # ==========================================
 # 0. 폰트 설정 (불변)
@@ -27,7 +27,8 @@ def font_setting():
         if not os.path.exists(font_path):
             url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
             try:
-                response = requests.get(url)
+                response = get_client().get(url, timeout=(3.05, 60))
+                response.raise_for_status()
                 with open(font_path, "wb") as f:
                     f.write(response.content)
             except: pass
@@ -87,21 +88,6 @@ def get_base_date(period_type, mode):
             return today - timedelta(days=1)
     return None
 
-def get_price_at_date(ticker, target_date):
-    start_date = target_date - timedelta(days=10)
-    end_date = target_date + timedelta(days=2)
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex):
-            df = df.xs('Close', axis=1, level=0)
-        else:
-            df = df[['Close']]
-        df.index = df.index.date
-        past_data = df[df.index <= target_date]
-        return float(past_data.iloc[-1].item()) if not past_data.empty else None
-    except: return None
-
 def fetch_data(target_list, period_type, status_mode):
     t_map = {
         '금': 'GC=F', '은': 'SI=F', '동': 'HG=F', 
@@ -120,6 +106,8 @@ def fetch_data(target_list, period_type, status_mode):
     res = []
     now_kst = get_korea_time()
     today = now_kst.date()
+    # 전 종목 한 번에 받아두고 아래에서는 메모리 조회만
+    history = BatchHistory([t_map.get(name) for name in target_list], period="10y" if status_mode == 'ATH' else "1y")
     
     # [ATH 모드]
     if status_mode == 'ATH':
@@ -127,7 +115,7 @@ def fetch_data(target_list, period_type, status_mode):
         for name in target_list:
             ticker = t_map.get(name)
             try:
-                hist = yf.download(ticker, period="10y", progress=False)
+                hist = history.full(ticker)
                 if hist.empty: continue
                 if isinstance(hist.columns, pd.MultiIndex):
                     close_val = hist.xs('Close', axis=1, level=0).iloc[-1].item()
@@ -161,7 +149,7 @@ def fetch_data(target_list, period_type, status_mode):
             ticker = t_map.get(name)
             try:
                 # 1. 넉넉하게 데이터 가져오기
-                recent = yf.download(ticker, period="3mo", progress=False)
+                recent = history.recent(ticker, days=92)
                 if recent.empty: continue
                 
                 if isinstance(recent.columns, pd.MultiIndex):
@@ -205,11 +193,9 @@ def fetch_data(target_list, period_type, status_mode):
                 else:
                     # 주간/월간/연간/Cycle
                     target_date = display_base_date_calc
-                    past_data = recent_close[recent_close.index <= target_date]
-                    if past_data.empty: 
+                    base = history.price_at(ticker, target_date, max_gap=10)
+                    if base is None: 
                         base = float(recent_close.iloc[0].item())
-                    else:
-                        base = float(past_data.iloc[-1].item())
                 
                 base = base if base else curr
                 change = ((curr - base) / base) * 100
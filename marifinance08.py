@@ -1,5 +1,4 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
@@ -7,10 +6,11 @@ import matplotlib.font_manager as fm
 import matplotlib.ticker as mticker
 import os
 import platform
-import requests
 from datetime import datetime, timedelta
 import pytz
 import numpy as np
+from price_history import BatchHistory
+from http_client import get_client
 
 # ==========================================
 # 0. 폰트 설정 (불변)
@@ -27,7 +27,8 @@ def font_setting():
         if not os.path.exists(font_path):
             url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
             try:
-                response = requests.get(url)
+                response = get_client().get(url, timeout=(3.05, 60))
+                response.raise_for_status()
                 with open(font_path, "wb") as f:
                     f.write(response.content)
             except: pass
@@ -85,28 +86,18 @@ def get_base_date(period_type, mode):
             return today - timedelta(days=1)
     return None
 
-def get_price_at_date(ticker, target_date):
-    start_date = target_date - timedelta(days=7)
-    end_date = target_date + timedelta(days=2)
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if df.empty: return None
-        df.index = df.index.date
-        past_data = df[df.index <= target_date]
-        return float(past_data['Close'].iloc[-1].item()) if not past_data.empty else None
-    except: return None
-
 def fetch_data(target_list, period_type, status_mode):
     t_map = {'금': 'GC=F', '은': 'SI=F', '동': 'HG=F', 'BTC': 'BTC-USD', 'ETH': 'ETH-USD', '코스피': '^KS11', '나스닥': '^IXIC', 'S&P': '^GSPC', '달러': 'DX-Y.NYB', '환율': 'KRW=X', '엔비디아': 'NVDA', '애플': 'AAPL', 'MS': 'MSFT', '아마존': 'AMZN', '구글': 'GOOG', 'TSMC': 'TSM', '브로드컴': 'AVGO', '테슬라': 'TSLA', '메타': 'META', '월마트': 'WMT', '일라이릴리': 'LLY', 'JP모건': 'JPM'}
     res = []
     calc_mode = 'CYCLE' if status_mode == 'Cycle' else 'FM'
     display_base_date = get_base_date(period_type, calc_mode)
     today = get_korea_time().date()
+    history = BatchHistory([t_map.get(name) for name in target_list])
 
     for name in target_list:
         ticker = t_map.get(name)
         try:
-            recent = yf.download(ticker, period="1mo", progress=False)
+            recent = history.recent(ticker, days=31)
             if recent.empty: continue
             last_idx_date = recent.index[-1].date()
             if status_mode == 'Completed':
@@ -123,9 +114,9 @@ def fetch_data(target_list, period_type, status_mode):
                      display_base_date = today - timedelta(days=2)
                 else:
                      display_base_date = today - timedelta(days=1)
-                base = get_price_at_date(ticker, display_base_date)
+                base = history.price_at(ticker, display_base_date)
             else:
-                base = get_price_at_date(ticker, display_base_date)
+                base = history.price_at(ticker, display_base_date)
             
             base = base if base else curr
             change = ((curr - base) / base) * 100
@@ -1,13 +1,13 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.font_manager as fm
 import os
 import platform
-import requests
 from datetime import datetime, timedelta
+from price_history import BatchHistory
+from http_client import get_client
 
 # ==========================================
 # 0. [실행력] 폰트 자동 설정 (에러 원천 차단)
@@ -33,7 +33,8 @@ def font_setting():
         if not os.path.exists(font_path):
             url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
             try:
-                response = requests.get(url)
+                response = get_client().get(url, timeout=(3.05, 60))
+                response.raise_for_status()
                 with open(font_path, "wb") as f:
                     f.write(response.content)
             except:
@@ -78,22 +79,10 @@ def hanmari_format(value, name):
 # ==========================================
 # 3. 데이터 엔진 (집요한 탐색 & 마감 로직)
 # ==========================================
-def get_historical_price(ticker, days_ago):
-    """휴장일을 피해 과거 데이터를 집요하게 찾아내는 함수"""
+def get_historical_price(history, ticker, days_ago):
+    """휴장일을 피해 과거 데이터를 찾아내는 함수 (일괄 다운로드된 history에서 as-of 조회)"""
     target_date = (datetime.now() - timedelta(days=days_ago)).date()
-    # 넉넉하게 20일 전부터 스캔
-    start_date = target_date - timedelta(days=20)
-    end_date = target_date + timedelta(days=1)
-    
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if df.empty: return None
-        df.index = df.index.date
-        # 목표일 이하 중 가장 최신 데이터 (Look-back)
-        past_data = df[df.index <= target_date]
-        return float(past_data['Close'].iloc[-1].item()) if not past_data.empty else None
-    except:
-        return None
+    return history.price_at(ticker, target_date, max_gap=20)
 
 def fetch_data(target_list, period_option, status_option):
     """마감(Completed)과 실시간(Live)을 구분하여 데이터를 가져오는 핵심 엔진"""
@@ -107,12 +96,13 @@ def fetch_data(target_list, period_option, status_option):
     
     days = 1 if '일간' in period_option else 7 if '주간' in period_option else 30 if '월간' in period_option else 365
     res = []
+    history = BatchHistory([t_map.get(name) for name in target_list])
     
     for name in target_list:
         ticker = t_map.get(name)
         try:
             # 최근 데이터 호출
-            recent = yf.download(ticker, period="1mo", progress=False)
+            recent = history.recent(ticker, days=31)
             if recent.empty: continue
             
             # [마감 로직] 오늘 날짜 데이터 배제 여부 결정
@@ -167,7 +157,7 @@ def fetch_data(target_list, period_option, status_option):
                     base = float(filtered['Close'].iloc[-1].item())
                 else:
                     # recent에 없으면 더 과거 데이터 쿼리
-                    base = get_historical_price(ticker, days + (1 if '마감' in status_option else 0))
+                    base = get_historical_price(history, ticker, days + (1 if '마감' in status_option else 0))
 
             base = base if base else curr
             change = ((curr - base) / base) * 100
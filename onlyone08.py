@@ -1,13 +1,13 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.font_manager as fm
 import os
 import platform
-import requests
 from datetime import datetime, timedelta
+from price_history import BatchHistory
+from http_client import get_client
 
 # ==========================================
 # 0. 폰트 설정 (유지)
@@ -24,7 +24,8 @@ def font_setting():
         if not os.path.exists(font_path):
             url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Regular.ttf"
             try:
-                response = requests.get(url)
+                response = get_client().get(url, timeout=(3.05, 60))
+                response.raise_for_status()
                 with open(font_path, "wb") as f:
                     f.write(response.content)
             except: pass
@@ -63,28 +64,21 @@ def hanmari_format(value, name):
 # ==========================================
 # 3. 데이터 엔진 (유지)
 # ==========================================
-def get_historical_price(ticker, days_ago):
+def get_historical_price(history, ticker, days_ago):
     target_date = (datetime.now() - timedelta(days=days_ago)).date()
-    start_date = target_date - timedelta(days=20)
-    end_date = target_date + timedelta(days=1)
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if df.empty: return None
-        df.index = df.index.date
-        past_data = df[df.index <= target_date]
-        return float(past_data['Close'].iloc[-1].item()) if not past_data.empty else None
-    except: return None
+    return history.price_at(ticker, target_date, max_gap=20)
 
 def fetch_data(target_list, period_option, status_option):
     t_map = {'금': 'GC=F', '은': 'SI=F', '동': 'HG=F', 'BTC': 'BTC-USD', 'ETH': 'ETH-USD', '코스피': '^KS11', '나스닥': '^IXIC', 'S&P': '^GSPC', '달러': 'DX-Y.NYB', '환율': 'KRW=X', '엔비디아': 'NVDA', '애플': 'AAPL', 'MS': 'MSFT', '아마존': 'AMZN', '구글': 'GOOG', 'TSMC': 'TSM', '브로드컴': 'AVGO', '테슬라': 'TSLA', '메타': 'META', '월마트': 'WMT', '일라이릴리': 'LLY', 'JP모건': 'JPM'}
     
     days = 1 if '일간' in period_option else 7 if '주간' in period_option else 30 if '월간' in period_option else 365
     res = []
+    history = BatchHistory([t_map.get(name) for name in target_list])
     
     for name in target_list:
         ticker = t_map.get(name)
         try:
-            recent = yf.download(ticker, period="1mo", progress=False)
+            recent = history.recent(ticker, days=31)
             if recent.empty: continue
             
             last_date = recent.index[-1].date()
@@ -109,7 +103,7 @@ def fetch_data(target_list, period_option, status_option):
                 search_date = curr_date - timedelta(days=days)
                 mask = recent.index.date <= search_date
                 filtered = recent[mask]
-                base = float(filtered['Close'].iloc[-1].item()) if not filtered.empty else get_historical_price(ticker, days + (1 if '마감' in status_option else 0))
+                base = float(filtered['Close'].iloc[-1].item()) if not filtered.empty else get_historical_price(history, ticker, days + (1 if '마감' in status_option else 0))
 
             base = base if base else curr
             change = ((curr - base) / base) * 100
@@ -0,0 +1,72 @@
+import yfinance as yf
+import pandas as pd
+import numpy as np
+
+# ==========================================
+# 공용 일괄 시세 엔진 (구버전 fetch_data 공용)
+# ==========================================
+# 종목마다 yf.download를 두 번씩 부르던 구조를 한 번의 일괄 다운로드로 바꾸고,
+# "특정일 이하 마지막 종가" 조회는 메모리 안에서 searchsorted(as-of)로 처리한다.
+class BatchHistory:
+    def __init__(self, tickers, period="2y"):
+        self.tickers = sorted({t for t in tickers if t})
+        self.close, self.high = pd.DataFrame(), pd.DataFrame()
+        if self.tickers:
+            try:
+                df = yf.download(self.tickers, period=period, interval="1d", progress=False)
+            except Exception:
+                df = pd.DataFrame()
+            self.close, self.high = self._parse(df)
+
+        # as-of 검색용 날짜 배열 + 앞방향 채움 종가 행렬 + 채운 값의 실제 관측일 (한 번만 계산)
+        self.dates = self.close.index.values.astype('datetime64[D]')
+        self.filled = self.close.ffill().to_numpy(dtype='float64')
+        days = self.dates.astype('int64').astype('float64')
+        observed = np.where(self.close.notna().to_numpy(), days[:, None], np.nan)
+        self.observed = pd.DataFrame(observed).ffill().to_numpy()
+        self.col = {t: i for i, t in enumerate(self.close.columns)}
+
+    def _parse(self, df):
+        if df is None or df.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        if isinstance(df.columns, pd.MultiIndex):
+            level = 0 if 'Close' in df.columns.get_level_values(0) else 1
+            close = df.xs('Close', axis=1, level=level)
+            high = df.xs('High', axis=1, level=level)
+        else:
+            close = df[['Close']].set_axis(self.tickers[:1], axis=1)
+            high = df[['High']].set_axis(self.tickers[:1], axis=1)
+
+        close.index = pd.to_datetime(close.index).tz_localize(None)
+        high.index = pd.to_datetime(high.index).tz_localize(None)
+        return close.sort_index(), high.sort_index()
+
+    def recent(self, ticker, days):
+        # 최근 N일 구간 (기존 yf.download(ticker, period=...) 결과처럼 Close/High 열)
+        if ticker not in self.col:
+            return pd.DataFrame()
+        start = pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+        df = pd.DataFrame({'Close': self.close[ticker], 'High': self.high[ticker]})
+        df = df[df.index >= start]
+        return df.dropna(subset=['Close'])
+
+    def full(self, ticker):
+        if ticker not in self.col:
+            return pd.DataFrame()
+        df = pd.DataFrame({'Close': self.close[ticker], 'High': self.high[ticker]})
+        return df.dropna(subset=['Close'])
+
+    def price_at(self, ticker, target_date, max_gap=7):
+        # target_date 이하 마지막 종가 (휴장일이면 직전 거래일 값)
+        # 단, 마지막 거래가 max_gap일보다 오래됐으면 None (구버전 조회 창: target_date - N일 ~ target_date)
+        j = self.col.get(ticker)
+        if j is None or len(self.dates) == 0:
+            return None
+        target = np.datetime64(target_date, 'D')
+        i = np.searchsorted(self.dates, target, side='right') - 1
+        if i < 0 or np.isnan(self.filled[i, j]):
+            return None
+        if max_gap is not None and target.astype('int64') - self.observed[i, j] > max_gap:
+            return None
+        return float(self.filled[i, j])
@@ -1,10 +1,10 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import platform
 from datetime import datetime, timedelta
+from price_history import BatchHistory
 
 # 1. 스타일 설정 (Bold / 한글-영문 혼용)
 def set_style():
@@ -29,18 +29,9 @@ def hanmari_format(value, name):
     return f"{prefix}{value:,.2f}"
 
 # 4. 데이터 엔진 (휴장일 추적 로직)
-def get_historical_price(ticker, days_ago):
+def get_historical_price(history, ticker, days_ago):
     target_date = (datetime.now() - timedelta(days=days_ago)).date()
-    start_date = target_date - timedelta(days=15)
-    end_date = target_date + timedelta(days=1)
-    try:
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        if df.empty: return None
-        df.index = df.index.date
-        past_data = df[df.index <= target_date]
-        return float(past_data['Close'].iloc[-1].item()) if not past_data.empty else None
-    except:
-        return None
+    return history.price_at(ticker, target_date, max_gap=15)
 
 def fetch_data(target_list, period_option):
     t_map = {
@@ -52,15 +43,16 @@ def fetch_data(target_list, period_option):
     }
     days = 1 if '일간' in period_option else 7 if '주간' in period_option else 30 if '월간' in period_option else 365
     res = []
+    history = BatchHistory([t_map.get(name) for name in target_list])
     for name in target_list:
         ticker = t_map.get(name)
         try:
-            recent = yf.download(ticker, period="5d", progress=False)
+            recent = history.recent(ticker, days=7)
             curr = float(recent['Close'].iloc[-1].item())
             if '일간' in period_option and len(recent) >= 2:
                 base = float(recent['Close'].iloc[-2].item())
             else:
-                base = get_historical_price(ticker, days)
+                base = get_historical_price(history, ticker, days)
             base = base if base else curr
             change = ((curr - base) / base) * 100
             